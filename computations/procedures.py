@@ -1,7 +1,7 @@
 import numpy as np
 import scipy.stats as stats
 
-from computations import stat_tests
+from computations import stat_tests, screening
 
 combinations = [
     ('T1', 'T2'),
@@ -14,7 +14,7 @@ combinations = [
 
 def within_max_dev(results, max_dev):
     """
-    Checks if all values in the results dictionary are within a specified maximum deviation.
+    Checks if the absolute values in the results dictionary are within a specified maximum deviation.
 
     Args:
     - results (dict): A dictionary containing the results to be checked.
@@ -23,7 +23,7 @@ def within_max_dev(results, max_dev):
     Returns:
     - bool: True if all values are within the maximum deviation, False otherwise.
     """
-    return all(value < max_dev for value in results.values())
+    return all(abs(value) <= max_dev for value in results.values())
 
 
 class Simplified:
@@ -82,14 +82,19 @@ class Full:
     Attributes:
     - distances (dict): Dictionary containing calculated distances between pairs of measurements.
     - single_distances (dict): Dictionary containing lists of individual distances for each pair of measurements.
+    - screening (Screening): Outlier screening of the single distances (None if not enabled).
+    - excluded (dict): Dictionary containing boolean arrays marking single distances excluded from the evaluation.
     - results (dict): Dictionary containing the calculated differences between pairs of distances.
     - alpha (float): Significance level for hypothesis testing.
     - residuals (dict): Dictionary containing residuals after subtracting single distances from average distances.
     - std_0_1 (float): Standard deviation of residuals for station S1.
     - std_0_2 (float): Standard deviation of residuals for station S2.
+    - v_1 (int): Degrees of freedom of std_0_1.
+    - v_2 (int): Degrees of freedom of std_0_2.
     - std_0 (float): Combined standard deviation based on the test procedure.
     - std_s1_s2_differed (bool): Flag indicating if standard deviations for stations S1 and S2 differed significantly.
     - std_mean_0 (float): Standard deviation of mean distances.
+    - v_mean (int): Degrees of freedom of std_mean_0.
     - u_ISO_TLS (float): Combined uncertainty based on the ISO and TLS measurements.
     - u_ms (float): Uncertainty based on the measurement standard (case A).
     - u_p (float): Uncertainty based on the precision (case B).
@@ -108,19 +113,31 @@ class Full:
         - data (DataFrame): The data containing measurements.
         - config (Config): Configuration object containing parameters for the test.
 
-        Initializes distances, single_distances, results, alpha, residuals, std_0_1, std_0_2,
-        std_0, std_s1_s2_differed, std_mean_0, u_ISO_TLS, u_ms, u_p, max_dev, and passed attributes.
+        Initializes distances, single_distances, screening, excluded, results, alpha, residuals,
+        std_0_1, std_0_2, v_1, v_2, std_0, std_s1_s2_differed, std_mean_0, v_mean, u_ISO_TLS, u_ms,
+        u_p, max_dev, and passed attributes.
         """
-        self.distances = dict()
         self.single_distances = dict()
         for station in ['S1', 'S2']:
             for i, j in combinations:
                 single_dist = []
                 for w in [1, 2, 3]:
                     single_dist.append(np.linalg.norm(data.loc[(station, w, j)] - data.loc[(station, w, i)]))
-                self.distances[(station, i, j)] = np.mean(single_dist)
                 self.single_distances[(station, i, j)] = single_dist
 
+        # Screening of the single distances for outliers, excluded observations are set to NaN
+        self.screening = None
+        self.excluded = {key: np.zeros(3, dtype=bool) for key in self.single_distances}
+        if config.screen:
+            self.screening = screening.Screening(self.single_distances, combinations, config.screen_k)
+            if config.screen == 'exclude':
+                self.excluded = self.screening.excluded
+        used_distances = {key: np.where(self.excluded[key], np.nan, single_dist) for key, single_dist in self.single_distances.items()}
+
+        self.distances = dict()
+        for key, single_dist in used_distances.items():
+            self.distances[key] = np.mean(single_dist[~self.excluded[key]])
+
         self.results = {
             'delta_1_2': self.distances[('S1', 'T1', 'T2')] - self.distances[('S2', 'T1', 'T2')],
             'delta_1_3': self.distances[('S1', 'T1', 'T3')] - self.distances[('S2', 'T1', 'T3')],
@@ -135,30 +152,36 @@ class Full:
         self.residuals = dict()
         for station in ['S1', 'S2']:
             for i, j in combinations:
-                self.residuals[(station, i, j)] = self.distances[(station, i, j)] - np.array(self.single_distances[(station, i, j)])
-        Omega_S1 = np.sum(np.concatenate((
+                self.residuals[(station, i, j)] = self.distances[(station, i, j)] - used_distances[(station, i, j)]
+        residuals_S1 = np.concatenate((
                                 self.residuals[('S1', 'T1', 'T2')],
                                 self.residuals[('S1', 'T1', 'T3')],
                                 self.residuals[('S1', 'T1', 'T4')],
                                 self.residuals[('S1', 'T2', 'T3')],
                                 self.residuals[('S1', 'T2', 'T4')],
                                 self.residuals[('S1', 'T3', 'T4')],
-                        ))**2)
-        Omega_S2 = np.sum(np.concatenate((
+                        ))
+        residuals_S2 = np.concatenate((
                                 self.residuals[('S2', 'T1', 'T2')],
                                 self.residuals[('S2', 'T1', 'T3')],
                                 self.residuals[('S2', 'T1', 'T4')],
                                 self.residuals[('S2', 'T2', 'T3')],
                                 self.residuals[('S2', 'T2', 'T4')],
                                 self.residuals[('S2', 'T3', 'T4')],
-                        ))**2)
+                        ))
+        Omega_S1 = np.nansum(residuals_S1**2)
+        Omega_S2 = np.nansum(residuals_S2**2)
+
+        # Degrees of freedom (12 per station without excluded observations)
+        self.v_1 = np.count_nonzero(~np.isnan(residuals_S1)) - len(combinations)
+        self.v_2 = np.count_nonzero(~np.isnan(residuals_S2)) - len(combinations)
 
-        self.std_0_1 = np.sqrt(Omega_S1/12)
-        self.std_0_2 = np.sqrt(Omega_S2/12)
+        self.std_0_1 = np.sqrt(Omega_S1/self.v_1)
+        self.std_0_2 = np.sqrt(Omega_S2/self.v_2)
 
         # Statistical test if std_0_1 and std_0_2 differ
-        if stat_tests.question_b(self.std_0_1, self.std_0_2, self.alpha, 12, 12):
-            self.std_0 = np.sqrt((Omega_S1+Omega_S2)/24)
+        if stat_tests.question_b(self.std_0_1, self.std_0_2, self.alpha, self.v_1, self.v_2):
+            self.std_0 = np.sqrt((Omega_S1+Omega_S2)/(self.v_1+self.v_2))
             self.std_s1_s2_differed = False
         else:
             self.std_0 = (self.std_0_1 + self.std_0_2)/2
@@ -171,22 +194,24 @@ class Full:
         d_mean_2_4 = (self.distances[('S1', 'T2', 'T4')] + self.distances[('S2', 'T2', 'T4')])/2
         d_mean_3_4 = (self.distances[('S1', 'T3', 'T4')] + self.distances[('S2', 'T3', 'T4')])/2
 
-        Omega_dist = np.sum(np.concatenate((
-                                d_mean_1_2 - self.single_distances[('S1', 'T1', 'T2')],
-                                d_mean_1_3 - self.single_distances[('S1', 'T1', 'T3')],
-                                d_mean_1_4 - self.single_distances[('S1', 'T1', 'T4')],
-                                d_mean_2_3 - self.single_distances[('S1', 'T2', 'T3')],
-                                d_mean_2_4 - self.single_distances[('S1', 'T2', 'T4')],
-                                d_mean_3_4 - self.single_distances[('S1', 'T3', 'T4')],
-                                d_mean_1_2 - self.single_distances[('S2', 'T1', 'T2')],
-                                d_mean_1_3 - self.single_distances[('S2', 'T1', 'T3')],
-                                d_mean_1_4 - self.single_distances[('S2', 'T1', 'T4')],
-                                d_mean_2_3 - self.single_distances[('S2', 'T2', 'T3')],
-                                d_mean_2_4 - self.single_distances[('S2', 'T2', 'T4')],
-                                d_mean_3_4 - self.single_distances[('S2', 'T3', 'T4')],
-                            ))**2)
-
-        self.std_mean_0 = np.sqrt(Omega_dist/30)
+        residuals_dist = np.concatenate((
+                                d_mean_1_2 - used_distances[('S1', 'T1', 'T2')],
+                                d_mean_1_3 - used_distances[('S1', 'T1', 'T3')],
+                                d_mean_1_4 - used_distances[('S1', 'T1', 'T4')],
+                                d_mean_2_3 - used_distances[('S1', 'T2', 'T3')],
+                                d_mean_2_4 - used_distances[('S1', 'T2', 'T4')],
+                                d_mean_3_4 - used_distances[('S1', 'T3', 'T4')],
+                                d_mean_1_2 - used_distances[('S2', 'T1', 'T2')],
+                                d_mean_1_3 - used_distances[('S2', 'T1', 'T3')],
+                                d_mean_1_4 - used_distances[('S2', 'T1', 'T4')],
+                                d_mean_2_3 - used_distances[('S2', 'T2', 'T3')],
+                                d_mean_2_4 - used_distances[('S2', 'T2', 'T4')],
+                                d_mean_3_4 - used_distances[('S2', 'T3', 'T4')],
+                            ))
+        Omega_dist = np.nansum(residuals_dist**2)
+        self.v_mean = np.count_nonzero(~np.isnan(residuals_dist)) - len(combinations)
+
+        self.std_mean_0 = np.sqrt(Omega_dist/self.v_mean)
         self.u_ISO_TLS = self.std_mean_0/np.sqrt(2)
 
         match config.case.upper():
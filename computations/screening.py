@@ -0,0 +1,136 @@
+import numpy as np
+
+mad_scale = 1.4826  # MAD to standard deviation for normally distributed values
+stations = ['S1', 'S2']
+
+
+def loo_residuals(d):
+    """
+    Calculates the leave-one-out residuals of single distances.
+
+    Each single distance is compared to the mean of the remaining sets of the same
+    station and pair of targets.
+
+    Args:
+    - d (ndarray): Single distances with the sets in the last axis, any leading axes
+      (e.g. campaigns, stations, pairs) are broadcast.
+
+    Returns:
+    - ndarray: Leave-one-out residuals, same shape as d.
+    """
+    n = d.shape[-1]
+    return d - (d.sum(axis=-1, keepdims=True) - d)/(n - 1)
+
+
+def scores(d):
+    """
+    Calculates robust scores of the leave-one-out residuals of a campaign.
+
+    The residuals are scaled by their median absolute deviation, pooled over both stations,
+    all pairs and all sets of a campaign.
+
+    Args:
+    - d (ndarray): Single distances of shape (..., stations, pairs, sets), leading axes
+      are treated as independent campaigns.
+
+    Returns:
+    - ndarray: Robust scores, same shape as d.
+    """
+    r = loo_residuals(d)
+    flat = r.reshape(*r.shape[:-3], -1)
+    med = np.median(flat, axis=-1, keepdims=True)
+    scale = mad_scale*np.median(np.abs(flat - med), axis=-1)
+    scale = np.where(scale > 0, scale, np.inf)
+    return (r - med[..., None, None])/scale[..., None, None, None]
+
+
+def flag(z, k):
+    """
+    Flags suspect single distances.
+
+    Only the observation with the largest absolute score of a station and pair of targets
+    can be flagged, so that the mean distance is always determined by the remaining sets.
+    If several observations share the largest score the outlier can't be identified and
+    none of them is flagged.
+
+    Args:
+    - z (ndarray): Robust scores of shape (..., sets).
+    - k (float): Threshold for the absolute score.
+
+    Returns:
+    - ndarray: Boolean array, same shape as z, True for suspect observations.
+    """
+    a = np.abs(z)
+    largest = a == a.max(axis=-1, keepdims=True)
+    return largest & (largest.sum(axis=-1, keepdims=True) == 1) & (a > k)
+
+
+class Screening:
+    """
+    Class representing the screening of the single distances for outliers.
+
+    A bad target center in one set affects all distances to this target, a target is therefore
+    reported as suspect if the majority of its distances in a set are flagged. For the exclusion
+    all distances of a suspect target center are used, not only the flagged ones, as long as
+    at least two sets of every distance remain; otherwise only the flagged distance of this
+    station and pair is excluded.
+
+    Attributes:
+    - k (float): Threshold for the absolute robust score.
+    - z (dict): Dictionary containing the robust scores of the single distances for each pair of measurements.
+    - flagged (dict): Dictionary containing boolean arrays marking suspect single distances for each pair of measurements.
+    - n_flagged (int): Number of flagged single distances.
+    - suspect_targets (list): List of (station, set, target) tuples of suspect target centers.
+    - excluded (dict): Dictionary containing boolean arrays marking the single distances to be excluded for each pair of measurements.
+    - n_excluded (int): Number of single distances to be excluded.
+
+    Methods:
+    - __init__(self, single_distances, pairs, k): Initializes the Screening.
+    """
+
+    def __init__(self, single_distances, pairs, k=3.5):
+        """
+        Initializes the Screening.
+
+        Args:
+        - single_distances (dict): Dictionary containing lists of individual distances for each pair of measurements.
+        - pairs (list): List of the (target, target) pairs.
+        - k (float): Threshold for the absolute robust score (default: 3.5).
+        """
+        self.k = k
+
+        d = np.array([[single_distances[(station, i, j)] for i, j in pairs] for station in stations])
+        z = scores(d)
+        flags = flag(z, k)
+
+        self.z = dict()
+        self.flagged = dict()
+        for s, station in enumerate(stations):
+            for p, (i, j) in enumerate(pairs):
+                self.z[(station, i, j)] = z[s, p]
+                self.flagged[(station, i, j)] = flags[s, p]
+        self.n_flagged = int(flags.sum())
+
+        targets = sorted({t for pair in pairs for t in pair})
+        self.suspect_targets = []
+        for s, station in enumerate(stations):
+            for t in targets:
+                involved = [p for p, pair in enumerate(pairs) if t in pair]
+                counts = flags[s, involved].sum(axis=0)
+                for w in np.flatnonzero(counts > len(involved)/2):
+                    self.suspect_targets.append((station, int(w) + 1, t))
+
+        excluded = flags.copy()
+        for station, w, t in self.suspect_targets:
+            s = stations.index(station)
+            for p, pair in enumerate(pairs):
+                if t in pair:
+                    excluded[s, p, w - 1] = True
+        too_many = excluded.sum(axis=-1) > 1  # at least two sets of every distance remain
+        excluded[too_many] = flags[too_many]
+
+        self.excluded = dict()
+        for s, station in enumerate(stations):
+            for p, (i, j) in enumerate(pairs):
+                self.excluded[(station, i, j)] = excluded[s, p]
+        self.n_excluded = int(excluded.sum())
@@ -0,0 +1,188 @@
+import numpy as np
+import pandas as pd
+
+from computations.procedures import combinations
+
+stations = ['S1', 'S2']
+targets = ['T1', 'T2', 'T3', 'T4']
+
+# Incidence of the targets in the pairs: +1 for the end point, -1 for the start point of a distance
+incidence = np.zeros((len(combinations), len(targets)))
+for k, (i, j) in enumerate(combinations):
+    incidence[k, targets.index(i)] = -1
+    incidence[k, targets.index(j)] = 1
+
+
+def coordinates(data):
+    """
+    Arranges the target center coordinates of a campaign in an array.
+
+    Args:
+    - data (DataFrame): The data containing measurements.
+
+    Returns:
+    - ndarray: Coordinates of shape (stations, sets, targets, 3).
+    """
+    sets = sorted(data.index.get_level_values('w').unique())
+    index = pd.MultiIndex.from_product([stations, sets, targets])
+    return data.loc[index, ['X', 'Y', 'Z']].to_numpy(dtype=float).reshape(len(stations), len(sets), len(targets), 3)
+
+
+def covariances(df, data):
+    """
+    Arranges the covariance matrices of the target centers in an array, in the same order as the
+    coordinates of the measurements. Entries of other sets are ignored.
+
+    Raises:
+    - KeyError: If the covariance matrix of a measured target center is missing.
+
+    Args:
+    - df (DataFrame): Covariance components sxx, syy, szz, sxy, sxz, syz indexed by station, set and target.
+    - data (DataFrame): The data containing measurements.
+
+    Returns:
+    - ndarray: Covariance matrices of shape (stations, sets, targets, 3, 3).
+    """
+    sets = sorted(data.index.get_level_values('w').unique())
+    index = pd.MultiIndex.from_product([stations, sets, targets])
+    missing = index.difference(df.index)
+    if len(missing):
+        raise KeyError(f'Covariance matrices missing for {", ".join(f"{s} set {w} {t}" for s, w, t in missing)}')
+    components = df.loc[index, ['sxx', 'sxy', 'sxz', 'sxy', 'syy', 'syz', 'sxz', 'syz', 'szz']].to_numpy(dtype=float)
+    return components.reshape(len(stations), len(sets), len(targets), 3, 3)
+
+
+def unit_vectors(P):
+    """
+    Calculates the unit vectors of all distances, which are the derivatives of a distance
+    with respect to its end point (and the negative derivatives with respect to its start point).
+
+    Args:
+    - P (ndarray): Coordinates of shape (..., stations, sets, targets, 3), leading axes are
+      treated as independent campaigns.
+
+    Returns:
+    - ndarray: Unit vectors of shape (..., stations, sets, pairs, 3).
+    """
+    diff = np.einsum('kt,...tc->...kc', incidence, P)
+    return diff/np.linalg.norm(diff, axis=-1, keepdims=True)
+
+
+def jacobian(P, weights):
+    """
+    Calculates the Jacobian of the deltas with respect to the target center coordinates.
+
+    Args:
+    - P (ndarray): Coordinates of shape (..., stations, sets, targets, 3).
+    - weights (ndarray): Weights of the single distances in the mean distances of shape
+      (..., stations, pairs, sets), e.g. 1/3 for the full test procedure.
+
+    Returns:
+    - ndarray: Jacobian of shape (..., pairs, stations, sets, targets, 3).
+    """
+    sign = np.array([1., -1.])  # delta = d_S1 - d_S2
+    return np.einsum('s,...skw,kt,...swkc->...kswtc', sign, weights, incidence, unit_vectors(P))
+
+
+def contributions(J, cov):
+    """
+    Propagates the covariance of the target centers through a Jacobian (GUM), separately for each point.
+
+    Args:
+    - J (ndarray): Jacobian of shape (..., pairs, stations, sets, targets, 3).
+    - cov (ndarray): Covariance matrices of the points of shape (..., stations, sets, targets, 3, 3).
+
+    Returns:
+    - ndarray: Variance contributions of shape (..., pairs, stations, sets, targets), summing up to
+      the variance of the deltas over the last three axes.
+    """
+    return np.einsum('...kswta,...swtab,...kswtb->...kswt', J, cov, J)
+
+
+def isotropic(cov):
+    """
+    Checks if all points have the same isotropic covariance matrix (u² times the identity).
+
+    In this case every point contributes the same share to the variance of a delta, the
+    ranking of the target centers carries no information.
+
+    Args:
+    - cov (ndarray): Covariance matrices of the points of shape (stations, sets, targets, 3, 3).
+
+    Returns:
+    - bool: True if the covariance matrices are equal and isotropic.
+    """
+    return np.allclose(cov, cov.flat[0]*np.eye(3), rtol=1e-9, atol=0)
+
+
+class Sensitivity:
+    """
+    Class representing the propagation of the target center uncertainties to the distances and deltas.
+
+    The points are assumed to be uncorrelated, each with its own 3x3 covariance matrix. The
+    target centers are only ranked if the covariance matrices differ between the points or are
+    anisotropic, with the same isotropic uncertainty for every coordinate (default: u_t) all
+    points contribute equally.
+
+    Attributes:
+    - jacobian (ndarray): Jacobian of the deltas with respect to the coordinates, shape (pairs, stations, sets, targets, 3).
+    - u_single_distances (dict): Dictionary containing the propagated uncertainties of the single distances for each pair of measurements.
+    - u_results (dict): Dictionary containing the propagated uncertainties of the deltas.
+    - covariance (ndarray): Covariance matrix of the deltas.
+    - isotropic (bool): Flag indicating if all points have the same isotropic covariance matrix.
+    - table (list): Ranked sensitivity table, list of (delta, station, set, target, share of variance, passed) tuples,
+      empty if isotropic.
+
+    Methods:
+    - __init__(self, data, test, u=None, cov=None): Initializes the Sensitivity.
+    """
+
+    def __init__(self, data, test, u=None, cov=None):
+        """
+        Initializes the Sensitivity.
+
+        Args:
+        - data (DataFrame): The data containing measurements.
+        - test (object): Instance of the test results (either Simplified or Full).
+        - u (float): Standard uncertainty of a single coordinate (default: u_t of the test).
+        - cov (ndarray): Covariance matrices of the points of shape (stations, sets, targets, 3, 3),
+          overrides u if given.
+        """
+        P = coordinates(data)
+        n_sets = P.shape[1]
+        if cov is None:
+            u = test.u_t if u is None else u
+            cov = np.broadcast_to(u**2*np.eye(3), P.shape + (3,))
+
+        used = np.ones((len(stations), len(combinations), n_sets), dtype=bool)
+        if hasattr(test, 'excluded'):
+            used = ~np.array([[test.excluded[(station, i, j)] for i, j in combinations] for station in stations])
+        weights = used/used.sum(axis=-1, keepdims=True)
+
+        self.jacobian = jacobian(P, weights)
+        c = contributions(self.jacobian, cov)
+        self.covariance = np.einsum('kswta,swtab,lswtb->kl', self.jacobian, cov, self.jacobian)
+
+        U = unit_vectors(P)
+        cov_pairs = np.einsum('kt,swtab->swkab', np.abs(incidence), cov)
+        u_single = np.sqrt(np.einsum('swka,swkab,swkb->skw', U, cov_pairs, U))
+
+        self.u_single_distances = dict()
+        self.u_results = dict()
+        for k, (i, j) in enumerate(combinations):
+            for s, station in enumerate(stations):
+                self.u_single_distances[(station, i, j)] = u_single[s, k]
+            self.u_results[f'delta_{i[1:]}_{j[1:]}'] = np.sqrt(self.covariance[k, k])
+
+        self.isotropic = isotropic(cov)
+        self.table = []
+        if self.isotropic:
+            return
+
+        share = c/c.sum(axis=(1, 2, 3), keepdims=True)
+        for k, s, w, t in zip(*np.unravel_index(np.argsort(-share, axis=None, kind='stable'), share.shape)):
+            key = f'delta_{combinations[k][0][1:]}_{combinations[k][1][1:]}'
+            passed = abs(test.results[key]) <= test.max_dev
+            self.table.append((key, stations[s], int(w) + 1, targets[t], float(share[k, s, w, t]), bool(passed)))
+        self.table.sort(key=lambda row: row[5])  # stable, failed deltas first
+        self.table = [row for row in self.table if row[4] > 0]
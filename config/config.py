@@ -9,6 +9,162 @@ header = 'ISO 17123-9 Calculation Automatisation, see chapters 7.5 and 8.3 of th
 metadata_keys = {'device','manufacturer','serial_number','FW_version','operator','datetime','temp','humidity','pressure','comment'}
 
 
+def add_test_arguments(parser):
+    """
+    Adds the arguments of the test procedures, shared by Config and ArchiveConfig.
+
+    Args:
+    - parser (ArgumentParser): Argument parser object for command line arguments.
+    """
+    parser.add_argument('-ftp', action='store_true', help='Perform the full test procedure')
+    parser.add_argument('-stp', action='store_true', help='Perform the simplified test procedure')
+    parser.add_argument('-alpha', type=float, default=0.05, help='Confidence interval (default: 0.05)')
+
+    simple_group = parser.add_argument_group('Simplified test procedure')
+    simple_group.add_argument('-u_t', type=float, help='Uncertainty quantity u_t for a targets center (in mm)')
+
+    full_group = parser.add_argument_group('Full test procedure')
+    full_group.add_argument('-case', help='Which case for a target uncertainty should be used (see 8.5.1 in the ISO document)')
+    full_group.add_argument('-u_ms', type=float, help='Manufacturer specified target center uncertainty (in mm)')
+    full_group.add_argument('-u_p', type=float, help='Derived target center uncertainty from other sources (in mm)')
+    full_group.add_argument('-screen', choices=['flag', 'exclude'], help='Screen the single distances for outliers and either only flag or also exclude them')
+    full_group.add_argument('-screen_k', type=float, default=3.5, help='Threshold for the robust score of the outlier screening (default: 3.5)')
+
+
+def ask(interactive):
+    """
+    Asks for a missing value, terminates the program if no interactive input is allowed.
+
+    Args:
+    - interactive (bool): Flag indicating if interactive input is allowed.
+
+    Returns:
+    - str: The input.
+    """
+    if not interactive:
+        sys.exit()
+    return input('> ')
+
+
+def ask_float(interactive):
+    """
+    Asks for a missing float value, terminates the program if no interactive input is allowed.
+
+    Args:
+    - interactive (bool): Flag indicating if interactive input is allowed.
+
+    Returns:
+    - float: The input.
+    """
+    try:
+        return float(ask(interactive))
+    except ValueError:
+        print('Invalid float value')
+        sys.exit()
+
+
+def parse_test_arguments(config, interactive):
+    """
+    Validates the arguments of the test procedures and asks for missing values.
+
+    Sets the attributes ftp, stp, alpha, u_t, case, u_ms, u_p, screen, screen_k and parameters of the
+    configuration object, uncertainties are converted from mm to m.
+
+    Args:
+    - config (Config or ArchiveConfig): Configuration object with the parsed arguments (args).
+    - interactive (bool): Flag indicating if missing values are asked for, otherwise the program terminates.
+    """
+    args = config.args
+
+    config.ftp = args.ftp
+    config.stp = args.stp
+    if config.ftp and config.stp:
+        print('Can only do one test procedure!')
+        print('Set either -ftp or -stp, but not both')
+        sys.exit()
+    if not config.ftp and not config.stp:
+        print('Specify full or simplified test procedure:')
+        print('(either "ftp" or "stp")')
+        test_proc = ask(interactive)
+        if test_proc == 'ftp':
+            config.ftp = True
+        elif test_proc == 'stp':
+            config.stp = True
+        else:
+            print('Invalid test procedure!')
+            sys.exit()
+
+    config.alpha = args.alpha
+    if not (0 < config.alpha < 1):
+        print(f'Invalid confidence interval! ({config.alpha})')
+        print('Must be between 0 and 1 (default 0.05)')
+        sys.exit()
+
+    # Parameters as given on the command line (uncertainties in mm)
+    config.parameters = {'procedure': 'ftp' if config.ftp else 'stp', 'alpha': config.alpha}
+    config.case = config.u_t = config.u_ms = config.u_p = None
+
+    if config.stp:
+        u_t = args.u_t
+        if not u_t:
+            print('No uncertainty quantity u_t for a targets center was specified!')
+            print('In case of the simple test procedure this has to specified (in mm)')
+            u_t = ask_float(interactive)
+        if u_t <= 0:
+            print("Uncertainty quantity u_t for a targets center can't be negative!")
+            sys.exit()
+        config.u_t = u_t/1e3
+        config.parameters['u_t'] = u_t
+
+    if config.ftp:
+        if not args.case:
+            print('Specify case for the uncertainty of a targets center, see 8.5.1 in the ISO document')
+            print('Must be either "A", "B" or "C"')
+            config.case = ask(interactive).lower()
+        else:
+            config.case = args.case.lower()
+        if config.case not in ['a', 'b', 'c']:
+            print('Invalid case for the uncertainty of a targets center! Must be A, B or C, see 8.5.1 in the ISO document')
+            sys.exit()
+        config.parameters['case'] = config.case
+
+        match config.case:
+            case 'a':
+                u_ms = args.u_ms
+                if not u_ms:
+                    print('Case A: Specify target center uncertainty (u_ms) as specified by the manufacturer (in mm)')
+                    u_ms = ask_float(interactive)
+                if u_ms <= 0:
+                    print("Uncertainty quantity u_ms for a targets center can't be negative!")
+                    sys.exit()
+                config.u_ms = u_ms/1e3
+                config.parameters['u_ms'] = u_ms
+            case 'b':
+                u_p = args.u_p
+                if not u_p:
+                    print('Case B: Derived target center uncertainty (u_p) from other sources (in mm)')
+                    u_p = ask_float(interactive)
+                if u_p <= 0:
+                    print("Uncertainty quantity u_p for a targets center can't be negative!")
+                    sys.exit()
+                config.u_p = u_p/1e3
+                config.parameters['u_p'] = u_p
+            case 'c':
+                pass # Special case of B with u_p = 0
+
+    config.screen = args.screen
+    config.screen_k = args.screen_k
+    if config.screen:
+        if not config.ftp:
+            print('Outlier screening is only available for the full test procedure!')
+            sys.exit()
+        if config.screen_k <= 0:
+            print(f'Invalid threshold for the outlier screening! ({config.screen_k})')
+            sys.exit()
+        config.parameters['screen'] = config.screen
+        config.parameters['screen_k'] = config.screen_k
+
+
 class Config:
     """
     Configuration class to handle input arguments, validation, and additional input.
@@ -27,9 +183,15 @@ class Config:
     - case (str): Case for the uncertainty of a target's center (A, B, or C).
     - u_ms (float): Manufacturer specified target center uncertainty.
     - u_p (float): Derived target center uncertainty from other sources.
+    - screen (str): Outlier screening of the single distances ('flag', 'exclude' or None).
+    - screen_k (float): Threshold for the robust score of the outlier screening.
+    - parameters (dict): Parameters of the test procedure as given on the command line.
+    - sensitivity (bool): Flag indicating if the sensitivity analysis is enabled.
+    - cov (str): Path to the covariance matrices of the target centers.
     - metadata (dict): Dictionary containing metadata information.
     - pdf (str): Path to save the generated PDF report.
     - csv (str): Path to save the results in CSV format.
+    - columnar (str): Directory to export the per-distance intermediates in columnar format.
     - current_dt (str): Current date and time.
 
     Methods:
@@ -50,22 +212,17 @@ class Config:
         self.parser.add_argument('data_directory', help='path to the files with target center coordinates')
         self.parser.add_argument('format', help=f'Which format the files are in. Currently supported: {", ".join(supported_formats)}')
         self.parser.add_argument('-ff', action='store_true', help='Fast-Forward (no interactive shell, files are treated to be in the correct order)')
-        self.parser.add_argument('-ftp', action='store_true', help='Perform the full test procedure')
-        self.parser.add_argument('-stp', action='store_true', help='Perform the simplified test procedure')
-        self.parser.add_argument('-alpha', type=float, default=0.05, help='Confidence interval (default: 0.05)')
+        add_test_arguments(self.parser)
 
-        simple_group = self.parser.add_argument_group('Simplified test procedure')
-        simple_group.add_argument('-u_t', type=float, help='Uncertainty quantity u_t for a targets center (in mm)')
-
-        full_group = self.parser.add_argument_group('Full test procedure')
-        full_group.add_argument('-case', help='Which case for a target uncertainty should be used (see 8.5.1 in the ISO document)')
-        full_group.add_argument('-u_ms', type=float, help='Manufacturer specified target center uncertainty (in mm)')
-        full_group.add_argument('-u_p', type=float, help='Derived target center uncertainty from other sources (in mm)')
+        sensitivity_group = self.parser.add_argument_group('Sensitivity analysis')
+        sensitivity_group.add_argument('-sensitivity', action='store_true', help='Propagate the target center uncertainties to the distances and deltas and rank the target centers by their influence')
+        sensitivity_group.add_argument('-cov', help='Path to a csv file with the covariance matrices of the target centers (in mm², default: u_t for each coordinate)')
 
         output_group = self.parser.add_argument_group('Output information')
         output_group.add_argument('-metadata', help='Path to metadata.yaml')
         output_group.add_argument('-pdf', help='Output Path to save generated pdf report')
         output_group.add_argument('-csv', help='Output Path to save results in csv (appending if already existing)')
+        output_group.add_argument('-columnar', help='Output directory for the per-distance intermediates of the full test procedure (parquet, npz if pyarrow is not installed)')
 
         self.args = self.parser.parse_args()
         print(header, end='\n\n')
@@ -97,86 +254,18 @@ class Config:
 
         self.ff = self.args.ff
 
-        self.ftp = self.args.ftp
-        self.stp = self.args.stp
-        if self.ftp and self.stp:
-            print('Can only do one test procedure!')
-            print('Set either -ftp or -stp, but not both')
-            sys.exit()
-        if not self.ftp and not self.stp:
-            print('Specify full or simplified test procedure:')
-            print('(either "ftp" or "stp")')
-            test_proc = input('> ')
-            if test_proc == 'ftp':
-                self.ftp = True
-            elif test_proc == 'stp':
-                self.stp = True
-            else:
-                print('Invalid test procedure!')
-                sys.exit()
-
-        self.alpha = self.args.alpha
-        if not (0 < self.alpha < 1):
-            print(f'Invalid confidence interval! ({self.alpha})')
-            print('Must be between 0 and 1 (default 0.05)')
-            sys.exit()
+        parse_test_arguments(self, interactive=True)
 
-        if self.stp:
-            if not self.args.u_t:
-                print('No uncertainty quantity u_t for a targets center was specified!')
-                print('In case of the simple test procedure this has to specified (in mm)')
-                try:
-                    self.u_t = float(input('> '))/1e3
-                except ValueError:
-                    print('Invalid float value')
-                    sys.exit()
-            else:
-                self.u_t = self.args.u_t/1e3
-            if self.u_t <= 0:
-                print("Uncertainty quantity u_t for a targets center can't be negative!")
+        self.sensitivity = self.args.sensitivity
+        self.cov = self.args.cov
+        if self.cov:
+            if not self.sensitivity:
+                print('Covariance matrices are only used for the sensitivity analysis (-sensitivity)!')
                 sys.exit()
-
-        if self.ftp:
-            if not self.args.case:
-                print('Specify case for the uncertainty of a targets center, see 8.5.1 in the ISO document')
-                print('Must be either "A", "B" or "C"')
-                self.case = input('> ').lower()
-            else:
-                self.case = self.args.case.lower()
-            if self.case not in 'abc':
-                print('Invalid case for the uncertainty of a targets center! Must be A, B or C, see 8.5.1 in the ISO document')
+            if not os.path.exists(self.cov):
+                print('Invalid path to the covariance matrices (csv file)!')
                 sys.exit()
 
-            match self.case:
-                case 'a':
-                    if not self.args.u_ms:
-                        print('Case A: Specify target center uncertainty (u_ms) as specified by the manufacturer (in mm)')
-                        try:
-                            self.u_ms = float(input('> '))/1e3
-                        except ValueError:
-                            print('Invalid float value')
-                            sys.exit()
-                    else:
-                        self.u_ms = self.args.u_ms/1e3
-                    if self.u_ms <= 0:
-                        print("Uncertainty quantity u_ms for a targets center can't be negative!")
-                        sys.exit()
-                case 'b':
-                    if not self.args.u_p:
-                        print('Case B: Derived target center uncertainty (u_p) from other sources (in mm)')
-                        try:
-                            self.u_p = float(input('> '))/1e3
-                        except ValueError:
-                            print('Invalid float value')
-                            sys.exit()
-                    else:
-                        self.u_p = self.args.u_p/1e3
-                    if self.u_p <= 0:
-                        print("Uncertainty quantity u_p for a targets center can't be negative!")
-                        sys.exit()
-                case 'c':
-                    pass # Special case of B with u_p = 0
-
         if self.metadata_path:
             with open(self.metadata_path, 'r') as f:
                 self.metadata = yaml.safe_load(f)['metadata']
@@ -214,4 +303,115 @@ class Config:
                 with open(self.csv, 'w') as f:
                     f.write('device,manufacturer,serial_number,FW_version,operator,datetime_test,datetime_eval,temp,humidity,pressure,u_TLS_ISO,passed,alpha,u_t,test_procedure,comment\n')
 
+        self.columnar = self.args.columnar
+        if self.columnar:
+            if not self.ftp:
+                print('Columnar export of the intermediates is only available for the full test procedure!')
+                sys.exit()
+            if not os.path.exists(self.columnar):
+                os.makedirs(self.columnar)
+
+        self.current_dt = datetime.now().strftime("%Y-%m-%d %H:%M")
+
+
+class ArchiveConfig:
+    """
+    Configuration class for the re-evaluation of an archive of campaigns.
+
+    The arguments of the test procedures are the same as for Config, but there is no interactive
+    input, invalid or missing arguments terminate the program.
+
+    Attributes:
+    - parser (ArgumentParser): Argument parser object for command line arguments.
+    - args (Namespace): Parsed arguments from the command line.
+    - root (str): Root directory of the archive.
+    - format (str): Format of the files. Currently supports only 'leica'.
+    - ftp (bool): Flag indicating if the full test procedure is used.
+    - stp (bool): Flag indicating if the simplified test procedure is used.
+    - alpha (float): Confidence interval level.
+    - u_t (float): Uncertainty quantity for the target's center.
+    - case (str): Case for the uncertainty of a target's center (A, B, or C).
+    - u_ms (float): Manufacturer specified target center uncertainty.
+    - u_p (float): Derived target center uncertainty from other sources.
+    - screen (str): Outlier screening of the single distances ('flag', 'exclude' or None).
+    - screen_k (float): Threshold for the robust score of the outlier screening.
+    - cov (str): File name of the covariance matrices of the target centers in the campaign directories.
+    - parameters (dict): Parameters of the evaluation as given on the command line, stored in the journal.
+    - journal (str): Path to the journal of the evaluation.
+    - previous (str): Path to the journal of a previous evaluation.
+    - diff (str): Path to save the differences of the verdicts in csv format.
+    - columnar (str): Directory to export the per-distance intermediates in columnar format.
+    - workers (int): Number of parallel processes.
+    - max_pending (int): Maximum number of campaigns submitted to the processes at once.
+    - current_dt (str): Current date and time.
+
+    Methods:
+    - __init__(self): Initializes the ArchiveConfig object, parses and validates the arguments.
+    """
+
+    def __init__(self):
+        """
+        Initializes the ArchiveConfig object.
+
+        Parses and validates the command line arguments.
+        """
+        self.parser = argparse.ArgumentParser(
+                        prog = 'iso17123-9-archive.py',
+                        description = 'ISO 17123-9 Calculation Automatisation, re-evaluation of an archive of campaigns')
+
+        self.parser.add_argument('root', help='root directory of the archive, every directory with the files of one campaign is evaluated')
+        self.parser.add_argument('format', help=f'Which format the files are in. Currently supported: {", ".join(supported_formats)}')
+        add_test_arguments(self.parser)
+
+        archive_group = self.parser.add_argument_group('Archive')
+        archive_group.add_argument('-journal', required=True, help='Path to the journal (json lines), an interrupted evaluation is resumed from it')
+        archive_group.add_argument('-previous', help='Path to the journal of a previous evaluation to compare the verdicts with')
+        archive_group.add_argument('-diff', help='Output Path to save the changed verdicts in csv')
+        archive_group.add_argument('-cov', help='File name of the covariance matrices of the target centers in every campaign directory (csv in mm², see -cov of iso17123-9.py), enables the sensitivity analysis')
+        archive_group.add_argument('-columnar', help='Output directory for the per-distance intermediates of the evaluated campaigns (full test procedure, parquet, npz if pyarrow is not installed)')
+        archive_group.add_argument('-j', type=int, default=os.cpu_count(), help='Number of parallel processes (default: number of cores)')
+        archive_group.add_argument('-max_pending', type=int, help='Maximum number of campaigns in evaluation at once (default: 4 per process)')
+
+        self.args = self.parser.parse_args()
+        print(header, end='\n\n')
+
+        self.root = self.args.root
+        if not os.path.isdir(self.root):
+            print('Invalid root directory!')
+            sys.exit()
+
+        self.format = self.args.format.lower()
+        if self.format not in supported_formats:
+            print(f'Unsupported format! ({self.format})')
+            sys.exit()
+
+        parse_test_arguments(self, interactive=False)
+        self.cov = self.args.cov
+        if self.cov:
+            if os.path.basename(self.cov) != self.cov:
+                print(f'Covariance matrices must be given as file name within the campaign directories! ({self.cov})')
+                sys.exit()
+            self.parameters['cov'] = self.cov
+
+        self.journal = self.args.journal
+        self.previous = self.args.previous
+        if self.previous and not os.path.exists(self.previous):
+            print('Invalid path to the previous journal!')
+            sys.exit()
+        self.diff = self.args.diff
+        for path in [self.journal, self.diff]:
+            if path and os.path.dirname(path) and not os.path.exists(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+
+        self.columnar = self.args.columnar
+        if self.columnar:
+            if not self.ftp:
+                print('Columnar export of the intermediates is only available for the full test procedure!')
+                sys.exit()
+            if not os.path.exists(self.columnar):
+                os.makedirs(self.columnar)
+
+        self.workers = max(1, self.args.j)
+        self.max_pending = self.args.max_pending or 4*self.workers
+
         self.current_dt = datetime.now().strftime("%Y-%m-%d %H:%M")
@@ -0,0 +1,469 @@
+import contextlib
+import hashlib
+import io
+import json
+import os
+import types
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import yaml
+
+from computations import procedures, sensitivity
+from io_helpers import columnar, read
+
+n_files = {'ftp': 6, 'stp': 2}
+n_sensitivity = 10  # rows of the sensitivity table stored in the journal
+
+# Parsed files of a worker process by hash, identical files of consecutive campaigns are parsed once
+parse_cache = OrderedDict()
+parse_cache_size = 36
+
+
+def data_files(directory, exclude=None):
+    """
+    List the data files of a directory (symlinks included, metadata and hidden files excluded).
+
+    Args:
+    - directory (str): Path to the directory.
+    - exclude (str): Name of a file which is no data file, e.g. the covariance matrices (default: None).
+
+    Returns:
+    - list: Sorted file names.
+    """
+    return sorted(f for f in os.listdir(directory)
+                  if not f.startswith('.') and not f.endswith(('.yaml', '.yml')) and f != exclude and os.path.isfile(os.path.join(directory, f)))
+
+
+def discover(root, procedure, exclude=None):
+    """
+    Find all campaigns below the root directory.
+
+    A campaign is a directory containing exactly the number of data files of the test procedure
+    (6 for the full, 2 for the simplified test procedure). Symlinked directories are not followed.
+
+    Args:
+    - root (str): Root directory of the archive.
+    - procedure (str): 'ftp' or 'stp'.
+    - exclude (str): Name of a file which is no data file (default: None).
+
+    Returns:
+    - campaigns (list): Paths of the campaign directories relative to the root.
+    - skipped (list): Paths of directories with data files but a different number of them.
+    """
+    campaigns, skipped = [], []
+    for directory, dirs, _ in os.walk(root):
+        dirs.sort()
+        files = data_files(directory, exclude)
+        if len(files) == n_files[procedure]:
+            campaigns.append(os.path.relpath(directory, root))
+        elif files:
+            skipped.append(os.path.relpath(directory, root))
+    return campaigns, skipped
+
+
+def file_hash(path):
+    """
+    Calculate the SHA-256 hash of the content of a file.
+
+    Args:
+    - path (str): Path to the file.
+
+    Returns:
+    - str: Hexadecimal digest.
+    """
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def error_message(path, e):
+    """
+    Error message of a file that can't be read.
+
+    Args:
+    - path (str): Path to the file.
+    - e (Exception): The raised exception.
+
+    Returns:
+    - str: File name, type of the exception and its message.
+    """
+    return f'{os.path.basename(path)}: {type(e).__name__}: {e}'
+
+
+def try_file_hash(path):
+    """
+    Calculate the SHA-256 hash of the content of a file, without raising if it can't be read.
+
+    Args:
+    - path (str): Path to the file.
+
+    Returns:
+    - str or OSError: Hexadecimal digest, or the exception if the file can't be read.
+    """
+    try:
+        return file_hash(path)
+    except OSError as e:
+        return e
+
+
+def hash_files(paths, workers):
+    """
+    Hash the content of files, files reached through symlinks or hard links are read only once.
+
+    Args:
+    - paths (list): Paths to the files.
+    - workers (int): Number of parallel threads.
+
+    Returns:
+    - hashes (dict): Hexadecimal digest for each readable path.
+    - errors (dict): Error message for each path that can't be read.
+    """
+    keys, errors = dict(), dict()
+    inodes = dict()
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            errors[path] = error_message(path, e)
+            continue
+        keys[path] = (st.st_dev, st.st_ino)
+        inodes.setdefault(keys[path], os.path.realpath(path))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        digests = dict(zip(inodes, executor.map(try_file_hash, inodes.values())))
+
+    hashes = dict()
+    for path, key in keys.items():
+        if isinstance(digests[key], OSError):
+            errors[path] = error_message(path, digests[key])
+        else:
+            hashes[path] = digests[key]
+    return hashes, errors
+
+
+def read_metadata(directory):
+    """
+    Read the metadata of a campaign from metadata.yaml in its directory (if existing).
+
+    An empty, malformed or unreadable file doesn't stop the evaluation, the metadata are then
+    unknown and the error is added as metadata_error.
+
+    Args:
+    - directory (str): Path to the campaign directory.
+
+    Returns:
+    - dict: Device, serial number and date of the scans (empty strings if unknown).
+    """
+    metadata = dict()
+    error = None
+    path = os.path.join(directory, 'metadata.yaml')
+    if os.path.exists(path):
+        try:
+            with open(path, 'r') as f:
+                content = yaml.safe_load(f)
+            metadata = content.get('metadata') if isinstance(content, dict) else None
+            if not isinstance(metadata, dict):
+                metadata = dict()
+                error = 'metadata.yaml: no metadata section'
+        except (OSError, yaml.YAMLError) as e:
+            error = error_message(path, e)
+    result = {key: str(metadata.get(key, '')) for key in ['device', 'serial_number', 'datetime']}
+    if error:
+        result['metadata_error'] = error
+    return result
+
+
+def parse(path, h):
+    """
+    Read the coordinates of one scan (executed in the worker processes).
+
+    The last parsed files of the process are kept by their hash, a file shared by several
+    campaigns is therefore usually parsed only once.
+
+    Args:
+    - path (str): Path to the file.
+    - h (str): Hash of the content of the file.
+
+    Returns:
+    - pd.DataFrame or str: Coordinates as returned by read_leica, or the error message if the file can't be read.
+    """
+    if h in parse_cache:
+        parse_cache.move_to_end(h)
+        return parse_cache[h]
+    try:
+        df = read.read_leica(path)
+    except Exception as e:
+        df = error_message(path, e)
+    parse_cache[h] = df
+    if len(parse_cache) > parse_cache_size:
+        parse_cache.popitem(last=False)
+    return df
+
+
+def evaluate(paths, hashes, parameters, intermediates=False):
+    """
+    Read and evaluate one campaign (executed in the worker processes).
+
+    Args:
+    - paths (list): Paths to the files of the single scans in the order S1 (set 1-3) -> S2 (set 1-3),
+      followed by the covariance matrices for the sensitivity analysis (only with the parameter cov).
+    - hashes (list): Hashes of the content of the files.
+    - parameters (dict): Parameters of the evaluation (see ArchiveConfig).
+    - intermediates (bool): Add the per-distance intermediates of the full test procedure (default: False).
+
+    Returns:
+    - dict: Verdict and results of the test, or the error message if a file can't be read or the evaluation failed.
+    """
+    cov_path = None
+    if parameters.get('cov'):
+        paths, hashes, cov_path = paths[:-1], hashes[:-1], paths[-1]
+
+    dfs = [parse(path, h) for path, h in zip(paths, hashes)]
+    errors = [df for df in dfs if isinstance(df, str)]
+    if errors:
+        return {'error': errors[0]}
+
+    config = types.SimpleNamespace(
+        ftp=parameters['procedure'] == 'ftp',
+        stp=parameters['procedure'] == 'stp',
+        alpha=parameters['alpha'],
+        case=parameters.get('case'),
+        screen=parameters.get('screen'),
+        screen_k=parameters.get('screen_k', 3.5),
+    )
+    for key in ['u_t', 'u_ms', 'u_p']:  # in mm as on the command line
+        if key in parameters:
+            setattr(config, key, parameters[key]/1e3)
+
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            data = read.combine(dfs, config)
+            if config.ftp:
+                test = procedures.Full(data, config)
+            else:
+                test = procedures.Simplified(data, config)
+            sens = None
+            if cov_path:
+                cov = sensitivity.covariances(read.parse_covariance(cov_path), data)
+                sens = sensitivity.Sensitivity(data, test, cov=cov)
+    except Exception as e:
+        return {'error': f'{type(e).__name__}: {e}'}
+
+    result = {
+        'passed': bool(test.passed),
+        'max_dev': float(test.max_dev),
+        'u_t': float(test.u_t),
+        'results': {key: float(value) for key, value in test.results.items()},
+    }
+    if config.ftp:
+        result['u_ISO_TLS'] = float(test.u_ISO_TLS)
+        result['std_s1_s2_differed'] = bool(test.std_s1_s2_differed)
+        if test.screening:
+            result['n_flagged'] = test.screening.n_flagged
+        if intermediates:
+            result['intermediates'] = columnar.intermediates(test)
+    if sens:
+        result['u_results'] = {key: float(value) for key, value in sens.u_results.items()}
+        result['sensitivity'] = [list(row) for row in sens.table[:n_sensitivity]]
+    return result
+
+
+def load_journal(path, parameters=None):
+    """
+    Load the entries of a journal, later entries of a campaign replace earlier ones.
+
+    Truncated lines (interrupted writes) are ignored.
+
+    Args:
+    - path (str): Path to the journal.
+    - parameters (dict): Only load entries evaluated with these parameters (default: all entries).
+
+    Returns:
+    - dict: Journal entry for each campaign.
+    """
+    entries = dict()
+    if path and os.path.exists(path):
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if parameters is None or entry['parameters'] == parameters:
+                    entries[entry['campaign']] = entry
+    return entries
+
+
+def evaluate_archive(config):
+    """
+    Evaluate all campaigns below the root directory of the archive.
+
+    Identical files are hashed once and identical campaigns are evaluated once. The files are
+    parsed in the worker processes, only the campaigns in evaluation (at most max_pending) are
+    held in memory. Campaigns already evaluated with the same input files and parameters in the
+    journal are not evaluated again, every new result is appended to the journal as soon as it is
+    available. Campaigns with files that can't be read or parsed, or whose evaluation failed, are
+    journaled with the error and evaluated again in the next run. With config.columnar the intermediates of the campaigns evaluated in
+    this run are exported to one columnar dataset, a campaign is only journaled once its
+    intermediates are on disk, so an interrupted export is repeated when the run is resumed.
+
+    Args:
+    - config (ArchiveConfig): Configuration object containing the parameters of the evaluation.
+
+    Returns:
+    - dict: Journal entry for each campaign of the archive.
+    """
+    procedure = config.parameters['procedure']
+    cov = config.parameters.get('cov')
+    campaigns, skipped = discover(config.root, procedure, cov)
+    print(f'Found {len(campaigns)} campaigns ({len(skipped)} directories skipped, wrong number of files)')
+
+    # The covariance matrices are an input of the campaign like the data files
+    files = {c: [os.path.join(config.root, c, f) for f in data_files(os.path.join(config.root, c), cov) + ([cov] if cov else [])]
+             for c in campaigns}
+    hashes, errors = hash_files([p for paths in files.values() for p in paths], config.workers)
+    inputs = {c: [hashes.get(p) for p in paths] for c, paths in files.items()}
+    print(f'{len(hashes)} files, {len(set(hashes.values()))} unique, {len(errors)} unreadable')
+
+    journal = load_journal(config.journal, config.parameters)
+    done = {c: e for c, e in journal.items() if c in inputs and e['inputs'] == inputs[c] and 'error' not in e}
+    pending = [c for c in campaigns if c not in done]
+    print(f'{len(done)} campaigns already in the journal, {len(pending)} to be evaluated')
+
+    # Identical campaigns (same files in the same order) are evaluated once
+    groups = dict()
+    unreadable = []
+    for c in pending:
+        if None in inputs[c]:
+            unreadable.append(c)
+        else:
+            groups.setdefault(tuple(inputs[c]), []).append(c)
+
+    # Terminate a line truncated by an interrupted run before appending
+    if os.path.exists(config.journal) and os.path.getsize(config.journal):
+        with open(config.journal, 'rb+') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                f.write(b'\n')
+
+    entries = dict(done)
+    running = dict()
+    # Journal entries of campaigns whose intermediates are not yet on disk, journaled once they are
+    exporting = dict()
+    writer = columnar.ColumnarWriter(config.columnar) if config.columnar else None
+    with ProcessPoolExecutor(max_workers=config.workers) as executor, open(config.journal, 'a') as journal_file:
+        try:
+            for c in unreadable:
+                future = Future()
+                future.set_result({'error': next(errors[p] for p in files[c] if p in errors)})
+                running[future] = [c]
+
+            queue = iter(groups.items())
+            while True:
+                while len(running) < config.max_pending:
+                    group = next(queue, None)
+                    if group is None:
+                        break
+                    key, members = group
+                    future = executor.submit(evaluate, files[members[0]], list(key), config.parameters, bool(config.columnar))
+                    running[future] = members
+                if not running:
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    result = future.result()
+                    rows = result.pop('intermediates', None)
+                    for c in running.pop(future):
+                        metadata = read_metadata(os.path.join(config.root, c))
+                        entry = {'campaign': c, 'inputs': inputs[c], 'parameters': config.parameters,
+                                 'datetime_eval': config.current_dt, **metadata, **result}
+                        entries[c] = entry
+                        if rows:
+                            campaign = os.path.abspath(os.path.join(config.root, c))
+                            exporting[campaign] = entry
+                            written = writer.append(rows, metadata, campaign, config.current_dt)
+                        else:
+                            written = []
+                            journal_file.write(json.dumps(entry) + '\n')
+                        for campaign in written:
+                            journal_file.write(json.dumps(exporting.pop(campaign)) + '\n')
+                journal_file.flush()
+                os.fsync(journal_file.fileno())
+                print(f'\r{len(entries)}/{len(campaigns)} campaigns evaluated', end='')
+        finally:
+            if writer:
+                for campaign in writer.close():
+                    journal_file.write(json.dumps(exporting.pop(campaign)) + '\n')
+                journal_file.flush()
+                os.fsync(journal_file.fileno())
+    print()
+
+    return entries
+
+
+def verdict(entry):
+    """
+    Verdict of a journal entry.
+
+    Args:
+    - entry (dict): Journal entry (None if the campaign is not in the journal).
+
+    Returns:
+    - str: 'passed', 'failed', 'error' or '' (not in the journal).
+    """
+    if entry is None:
+        return ''
+    if 'error' in entry:
+        return 'error'
+    return 'passed' if entry['passed'] else 'failed'
+
+
+def diff(entries, previous):
+    """
+    Compare the verdicts of the evaluation with a previous evaluation.
+
+    Args:
+    - entries (dict): Journal entry for each campaign of the current evaluation.
+    - previous (dict): Journal entry for each campaign of the previous evaluation.
+
+    Returns:
+    - changes (list): (campaign, previous verdict, verdict) for each campaign with a different verdict,
+      including campaigns only evaluated in one of both.
+    - n_unchanged (int): Number of campaigns with the same verdict.
+    """
+    changes = []
+    n_unchanged = 0
+    for c in sorted(set(entries) | set(previous)):
+        old, new = verdict(previous.get(c)), verdict(entries.get(c))
+        if old == new:
+            n_unchanged += 1
+        else:
+            changes.append((c, old, new))
+    return changes, n_unchanged
+
+
+def write_diff(path, changes, entries, previous):
+    """
+    Save the changed verdicts in csv format.
+
+    Args:
+    - path (str): Output path of the csv file.
+    - changes (list): Changed verdicts as returned by diff.
+    - entries (dict): Journal entry for each campaign of the current evaluation.
+    - previous (dict): Journal entry for each campaign of the previous evaluation.
+    """
+    with open(path, 'w') as f:
+        f.write('campaign,device,serial_number,datetime_test,previous_verdict,verdict,previous_max_dev,max_dev\n')
+        for c, old, new in changes:
+            entry = entries.get(c) or previous.get(c)
+            f.write(f"\"{c}\","
+                    f"{entry.get('device', '')},"
+                    f"{entry.get('serial_number', '')},"
+                    f"{entry.get('datetime', '')},"
+                    f"{old},"
+                    f"{new},"
+                    f"{previous.get(c, dict()).get('max_dev', '')},"
+                    f"{entries.get(c, dict()).get('max_dev', '')}\n")
@@ -0,0 +1,232 @@
+import os
+import re
+import uuid
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+from computations.procedures import combinations
+
+partition_keys = ['device', 'serial_number']
+string_columns = ['datetime_eval', 'campaign', 'date', 'station', 'target_i', 'target_j']
+numeric_columns = ['set', 'single_distance', 'residual', 'distance', 'delta']
+bool_columns = ['flagged', 'excluded']
+columns = string_columns + numeric_columns + bool_columns
+intermediate_columns = columns[3:]  # without the columns of the campaign
+
+
+def partition_value(value):
+    """
+    Converts a metadata value into a string usable as a directory name.
+
+    Args:
+    - value (object): Metadata value (e.g. device name or date of the scans).
+
+    Returns:
+    - str: Sanitized value, '__unknown__' if the value is empty.
+    """
+    value = re.sub(r'[^\w.\-]+', '_', str(value).strip())
+    return value if value else '__unknown__'
+
+
+def partition_directory(root, partition):
+    """
+    Creates the directory of a partition.
+
+    Args:
+    - root (str): Root directory of the partitioned dataset.
+    - partition (tuple): Values of the partition keys.
+
+    Returns:
+    - str: Path of the directory.
+    """
+    directory = os.path.join(root, *(f'{k}={v}' for k, v in zip(partition_keys, partition)))
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def intermediates(test):
+    """
+    Collects the per-distance intermediates of the full test procedure, one row per station,
+    pair of targets and set.
+
+    Args:
+    - test (Full): An instance of the Full class containing the test results.
+
+    Returns:
+    - dict: Lists of the values for each column of intermediate_columns.
+    """
+    rows = {c: [] for c in intermediate_columns}
+    for station in ['S1', 'S2']:
+        for i, j in combinations:
+            key = (station, i, j)
+            flagged = test.screening.flagged[key] if test.screening else np.zeros(len(test.single_distances[key]), dtype=bool)
+            delta = test.results[f'delta_{i[1:]}_{j[1:]}']
+            for w, (d, r) in enumerate(zip(test.single_distances[key], test.residuals[key]), start=1):
+                rows['station'].append(station)
+                rows['target_i'].append(i)
+                rows['target_j'].append(j)
+                rows['set'].append(w)
+                rows['single_distance'].append(float(d))
+                rows['residual'].append(float(r))
+                rows['distance'].append(float(test.distances[key]))
+                rows['delta'].append(float(delta))
+                rows['flagged'].append(bool(flagged[w - 1]))
+                rows['excluded'].append(bool(test.excluded[key][w - 1]))
+    return rows
+
+
+class ColumnarWriter:
+    """
+    Buffered writer for the per-distance intermediates of the full test procedure.
+
+    Rows (one per station, pair of targets and set) of any number of campaigns are accumulated
+    in memory per partition. A partition is written as soon as it holds row_group_size rows,
+    all partitions are written if max_buffered_rows are held in memory and when the writer is
+    closed. Every write creates one complete file, Parquet (one row group) or compressed NumPy
+    .npz if pyarrow is not installed. Files are first written under a hidden name and renamed
+    when complete, readers therefore never see partial files and no file stays open.
+
+    Files are partitioned in the directories device=<device>/serial_number=<serial_number>
+    below the root directory, the partition keys are therefore not repeated as columns within
+    the files. The date of the scans is a column.
+
+    Attributes:
+    - root (str): Root directory of the partitioned dataset.
+    - row_group_size (int): Number of buffered rows of a partition which triggers its write.
+    - max_buffered_rows (int): Number of buffered rows of all partitions which triggers a flush.
+    - format (str): Output format, either 'parquet' or 'npz'.
+    - buffered_rows (int): Number of rows currently held in memory.
+
+    Methods:
+    - append(self, rows, metadata, campaign, datetime_eval): Buffers the intermediates of one evaluated campaign.
+    - flush(self): Writes all buffered rows to disk.
+    - close(self): Flushes remaining rows.
+    - write(self, partition): Writes the buffered rows of one partition to a new file.
+    """
+
+    def __init__(self, root, row_group_size=100_000, max_buffered_rows=1_000_000, format=None):
+        """
+        Initializes the ColumnarWriter.
+
+        Args:
+        - root (str): Root directory of the partitioned dataset.
+        - row_group_size (int): Number of buffered rows of a partition which triggers its write (default: 100000).
+        - max_buffered_rows (int): Number of buffered rows of all partitions which triggers a flush (default: 1000000).
+        - format (str): 'parquet' or 'npz' (default: 'parquet' if pyarrow is installed, else 'npz').
+        """
+        self.root = root
+        self.row_group_size = row_group_size
+        self.max_buffered_rows = max_buffered_rows
+        self.format = format or ('parquet' if pa is not None else 'npz')
+        if self.format == 'parquet' and pa is None:
+            raise ImportError("pyarrow not installed, can't write parquet files")
+        self.buffered_rows = 0
+        self._buffers = dict()
+        self._campaigns = dict()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def append(self, rows, metadata, campaign, datetime_eval):
+        """
+        Buffers the intermediates of one evaluated campaign.
+
+        Args:
+        - rows (dict): Intermediates of the campaign as returned by intermediates.
+        - metadata (dict): Metadata of the campaign (device, serial_number and datetime of the scans).
+        - campaign (str): Path to the directory of the campaign.
+        - datetime_eval (str): Date and time of the evaluation.
+
+        Returns:
+        - list: Campaigns whose intermediates were written to disk by this call.
+        """
+        partition = (partition_value(metadata['device']), partition_value(metadata['serial_number']))
+        buffer = self._buffers.setdefault(partition, {c: [] for c in columns})
+        self._campaigns.setdefault(partition, []).append(campaign)
+
+        n = len(rows['set'])
+        buffer['datetime_eval'] += [datetime_eval]*n
+        buffer['campaign'] += [campaign]*n
+        buffer['date'] += [str(metadata['datetime']).strip().split(' ')[0]]*n
+        for c in intermediate_columns:
+            buffer[c] += rows[c]
+        self.buffered_rows += n
+
+        if self.buffered_rows >= self.max_buffered_rows:
+            return self.flush()
+        if len(buffer['set']) >= self.row_group_size:
+            return self.write(partition)
+        return []
+
+    def flush(self):
+        """
+        Writes all buffered rows to disk, one file per partition.
+
+        Returns:
+        - list: Campaigns whose intermediates were written to disk.
+        """
+        written = []
+        for partition in list(self._buffers):
+            written += self.write(partition)
+        return written
+
+    def close(self):
+        """
+        Flushes remaining rows.
+
+        Returns:
+        - list: Campaigns whose intermediates were written to disk.
+        """
+        return self.flush()
+
+    def write(self, partition):
+        """
+        Writes the buffered rows of one partition to a new file.
+
+        Args:
+        - partition (tuple): Values of the partition keys.
+
+        Returns:
+        - list: Campaigns whose intermediates were written to disk.
+        """
+        buffer = self._buffers.pop(partition)
+        arrays = {c: np.asarray(buffer[c], dtype=str) for c in string_columns}
+        arrays['set'] = np.asarray(buffer['set'], dtype=np.int8)
+        for c in numeric_columns[1:]:
+            arrays[c] = np.asarray(buffer[c], dtype=np.float64)
+        for c in bool_columns:
+            arrays[c] = np.asarray(buffer[c], dtype=bool)
+
+        directory = partition_directory(self.root, partition)
+        name = f'part-{uuid.uuid4().hex}.{self.format}'
+        incomplete = os.path.join(directory, f'.{name}')
+        if self.format == 'parquet':
+            table = pa.table({c: arrays[c] for c in columns})
+            pq.write_table(table, incomplete, row_group_size=len(table), compression='zstd')
+        else:
+            np.savez_compressed(incomplete, **arrays)
+        os.replace(incomplete, os.path.join(directory, name))
+
+        self.buffered_rows -= len(buffer['set'])
+        return self._campaigns.pop(partition)
+
+
+def append_results(test, config):
+    """
+    Export the per-distance intermediates of the full test procedure to the columnar dataset.
+
+    Args:
+    - test (Full): An instance of the Full class containing the test results.
+    - config (Config): Configuration object containing metadata and the output directory.
+    """
+    with ColumnarWriter(config.columnar) as writer:
+        writer.append(intermediates(test), config.metadata, os.path.abspath(config.data_directory), config.current_dt)
@@ -28,6 +28,18 @@ def full(test):
     """
     print('Results (full test procedure)')
 
+    if test.screening:
+        action = 'excluded' if any(mask.any() for mask in test.excluded.values()) else 'flagged'
+        print(f'Outlier screening (k={test.screening.k}): {test.screening.n_flagged} single distance(s) flagged')
+        for (station, i, j), mask in test.screening.flagged.items():
+            for w in np.flatnonzero(mask):
+                print(f'  {station} set {w+1} {i}-{j}: score {round(test.screening.z[(station, i, j)][w], 1)}')
+        for station, w, t in test.screening.suspect_targets:
+            print(f'  suspect target center: {station} set {w} {t}')
+        if action == 'excluded':
+            print(f'{test.screening.n_excluded} single distance(s) excluded (including all distances of suspect target centers)')
+            print(f'Degrees of freedom: v_1={test.v_1}, v_2={test.v_2}, v_mean={test.v_mean}')
+
     if test.std_s1_s2_differed:
         print(f'S1 and S2 have significantly different std deviations!')
         print(f'std_0_1: {round(test.std_0_1*1e3, 3)}mm\nstd_0_2: {round(test.std_0_2*1e3, 3)}mm')
@@ -41,3 +53,49 @@ def full(test):
         else:
             check = '\033[91m■\033[0m'
         print(f'{key}: {str(round(value*1e3, 3)).rjust(6)}mm {check}')
+
+def sensitivity(sens, n=10):
+    """
+    Print the propagated uncertainties and the most influential target centers.
+
+    Args:
+    - sens (Sensitivity): An instance of the Sensitivity class.
+    - n (int): Number of rows of the sensitivity table to print (default: 10).
+    """
+    print('Propagated uncertainties of the deltas')
+    for key, value in sens.u_results.items():
+        print(f'u({key}): {str(round(value*1e3, 3)).rjust(6)}mm')
+
+    if sens.isotropic:
+        print('All target centers have the same isotropic uncertainty and contribute equally to the deltas')
+        print('Specify their covariance matrices (-cov) to rank them')
+        return
+
+    print('Share of the variance of the deltas per target center (failed deltas first)')
+    for key, station, w, t, share, passed in sens.table[:n]:
+        if passed:
+            check = '\033[92m■\033[0m'
+        else:
+            check = '\033[91m■\033[0m'
+        print(f'{key} {check} {station} set {w} {t}: {str(round(share*100, 1)).rjust(5)}%')
+
+def archive(entries, changes, n_unchanged):
+    """
+    Print the summary of the re-evaluation of an archive and the changed verdicts.
+
+    Args:
+    - entries (dict): Journal entry for each campaign of the archive.
+    - changes (list): (campaign, previous verdict, verdict) for each changed verdict.
+    - n_unchanged (int): Number of campaigns with the same verdict.
+    """
+    verdicts = ['error' if 'error' in e else 'passed' if e['passed'] else 'failed' for e in entries.values()]
+    print('Results (archive)')
+    print(f'passed: {verdicts.count("passed")}, failed: {verdicts.count("failed")}, errors: {verdicts.count("error")}')
+    for c, e in entries.items():
+        if 'error' in e:
+            print(f'  {c}: {e["error"]}')
+
+    if changes or n_unchanged:
+        print(f'Verdicts compared to the previous evaluation: {n_unchanged} unchanged, {len(changes)} changed')
+        for c, old, new in changes:
+            print(f'  {c}: {old or "-"} -> {new or "-"}')
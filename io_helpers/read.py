@@ -3,6 +3,45 @@ import sys
 
 import pandas as pd
 
+naming = {
+    'ftp': [('S1', 1), ('S1', 2), ('S1', 3), ('S2', 1), ('S2', 2), ('S2', 3)],
+    'stp': [('S1', 1), ('S2', 1)],
+}
+
+
+def read_leica(path):
+    """
+    Read the target center coordinates of one scan exported in the leica format.
+
+    Args:
+    - path (str): Path to the file.
+
+    Returns:
+    - df (pd.DataFrame): Coordinates with the columns T, X, Y, Z.
+    """
+    return pd.read_csv(path, header=0, usecols=['T', 'X', 'Y', 'Z'], names=['T', 'X', 'Y', 'Z'])
+
+
+def combine(dfs, config):
+    """
+    Combine the coordinates of the single scans, in the order S1 (set 1-3) -> S2 (set 1-3).
+
+    Args:
+    - dfs (list): DataFrames of the single scans as returned by read_leica.
+    - config (Config): Configuration object containing the test procedure.
+
+    Returns:
+    - result_df (pd.DataFrame): Coordinates indexed by station, set and target.
+    """
+    order = naming['ftp'] if config.ftp else naming['stp']
+    dfs = [df.copy() for df in dfs]
+    for df, (station, w) in zip(dfs, order):
+        df[['S', 'w']] = (station, w)
+
+    result_df = pd.concat(dfs, ignore_index=True)
+    return result_df.set_index(['S', 'w', 'T'])
+
+
 def read_path(config):
     """
     Read and process data files based on the configuration.
@@ -30,33 +69,67 @@ def read_path(config):
                 print(80*'-')
 
 
-            if config.ftp:
-                naming = [('S1', 1), ('S1', 2), ('S1', 3), ('S2', 1), ('S2', 2), ('S2', 3)]
-                if len(files) != 6:
-                    print('Did not find 6 files for full test procedure')
-                    sys.exit()
-            if config.stp:
-                naming = [('S1', 1), ('S2', 1)]
-                if len(files) != 2:
-                    print('Did not find 2 files for simplified test procedure')
-                    sys.exit()
+            if config.ftp and len(files) != 6:
+                print('Did not find 6 files for full test procedure')
+                sys.exit()
+            if config.stp and len(files) != 2:
+                print('Did not find 2 files for simplified test procedure')
+                sys.exit()
 
             print('Files to be used in the following order:')
             for nr, f in enumerate(files):
                 print(f'[{nr}] {f}')
             print(80*'-')
 
-            dfs = []
-            for i, f in enumerate(files):
-                df = pd.read_csv(os.path.join(config.data_directory, f), header=0, usecols=['T', 'X', 'Y', 'Z'], names=['T', 'X', 'Y', 'Z'])
-                df[['S', 'w']] = naming[i]
-                dfs.append(df)
-
-            result_df = pd.concat(dfs, ignore_index=True)
-            result_df = result_df.set_index(['S', 'w', 'T'])
+            dfs = [read_leica(os.path.join(config.data_directory, f)) for f in files]
+            result_df = combine(dfs, config)
             print('Imported coordinates:')
             print(result_df)
             print(80*'-')
 
             return result_df
 
+
+def parse_covariance(path):
+    """
+    Parse the covariance matrices of the target centers (see read_covariance for the format).
+
+    Args:
+    - path (str): Path to the csv file.
+
+    Returns:
+    - df (pd.DataFrame): Covariance components (in m²) indexed by station, set and target.
+    """
+    df = pd.read_csv(path, usecols=['S', 'w', 'T', 'sxx', 'syy', 'szz', 'sxy', 'sxz', 'syz'])
+    return df.set_index(['S', 'w', 'T'])/1e6
+
+
+def read_covariance(path, data):
+    """
+    Read the covariance matrices of the target centers.
+
+    The file is a csv with the columns S, w, T, sxx, syy, szz, sxy, sxz, syz (in mm²),
+    one line for each station, set and target. A matrix is required for every measured
+    target center, lines of other target centers are ignored.
+
+    Args:
+    - path (str): Path to the csv file.
+    - data (pd.DataFrame): The data containing measurements.
+
+    Returns:
+    - df (pd.DataFrame): Covariance components (in m²) indexed by station, set and target.
+    """
+    df = parse_covariance(path)
+
+    missing = data.index.difference(df.index)
+    if len(missing):
+        print(f'Covariance matrices missing for {len(missing)} target centers!')
+        print(', '.join(f'{s} set {w} {t}' for s, w, t in missing))
+        sys.exit()
+    df = df.loc[data.index]
+
+    print('Imported covariances:')
+    print(df)
+    print(80*'-')
+
+    return df
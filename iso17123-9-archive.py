@@ -0,0 +1,18 @@
+#! /bin/env python
+
+from io_helpers import archive, print_results
+from config.config import ArchiveConfig
+
+if __name__ == '__main__':
+    config = ArchiveConfig()
+
+    entries = archive.evaluate_archive(config)
+
+    changes, n_unchanged = [], 0
+    if config.previous:
+        previous = archive.load_journal(config.previous)
+        changes, n_unchanged = archive.diff(entries, previous)
+        if config.diff:
+            archive.write_diff(config.diff, changes, entries, previous)
+
+    print_results.archive(entries, changes, n_unchanged)
@@ -1,7 +1,7 @@
 #! /bin/env python
 
-from io_helpers import read, print_results, csv
-from computations import procedures
+from io_helpers import read, print_results, csv, columnar
+from computations import procedures, sensitivity
 from config.config import Config
 
 if __name__ == '__main__':
@@ -16,9 +16,17 @@ if __name__ == '__main__':
         test = procedures.Simplified(measurements, config)
         print_results.simplified(test)
 
+    if config.sensitivity:
+        cov = sensitivity.covariances(read.read_covariance(config.cov, measurements), measurements) if config.cov else None
+        sens = sensitivity.Sensitivity(measurements, test, cov=cov)
+        print_results.sensitivity(sens)
+
     if config.csv:
         csv.append_results(test, config)
 
+    if config.columnar:
+        columnar.append_results(test, config)
+
     if config.pdf:
         from io_helpers import pdf
         pdf.generate_report(test, config)
@@ -0,0 +1,173 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import yaml
+
+cases_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cases')
+
+# Target centers (in m) of the synthetic test field, roughly 10 m to 25 m apart
+field = np.array([
+    [10.0, 0.0, 1.0],
+    [0.0, 12.0, 1.5],
+    [-9.0, -3.0, 0.5],
+    [4.0, -11.0, 2.0],
+])
+
+# Synthetic reference campaigns: parameters of the evaluation and of the simulated scanner
+synthetic_cases = {
+    'ftp_case_a_pass': {
+        'description': 'Full test procedure, case A, unbiased scanner',
+        'procedure': 'ftp', 'parameters': {'alpha': 0.05, 'case': 'a', 'u_ms': 1.0},
+        'seed': 1, 'noise': 0.0005, 'scale': 0.0,
+    },
+    'ftp_case_b_pass': {
+        'description': 'Full test procedure, case B, unbiased scanner',
+        'procedure': 'ftp', 'parameters': {'alpha': 0.05, 'case': 'b', 'u_p': 1.0},
+        'seed': 2, 'noise': 0.0005, 'scale': 0.0,
+    },
+    'ftp_case_c_fail': {
+        'description': 'Full test procedure, case C, scale error of 100 ppm on S2',
+        'procedure': 'ftp', 'parameters': {'alpha': 0.05, 'case': 'c'},
+        'seed': 3, 'noise': 0.0003, 'scale': 1e-4,
+    },
+    'ftp_outlier_flag': {
+        'description': 'Full test procedure, case C, bad target center S1 set 2 T3 (flagged only)',
+        'procedure': 'ftp', 'parameters': {'alpha': 0.05, 'case': 'c', 'screen': 'flag'},
+        'seed': 4, 'noise': 0.0005, 'scale': 0.0, 'outlier': ['S1', 2, 'T3', [0.006, -0.004, 0.0]],
+    },
+    'ftp_outlier_exclude': {
+        'description': 'Full test procedure, case C, bad target center S1 set 2 T3 (excluded)',
+        'procedure': 'ftp', 'parameters': {'alpha': 0.05, 'case': 'c', 'screen': 'exclude'},
+        'seed': 4, 'noise': 0.0005, 'scale': 0.0, 'outlier': ['S1', 2, 'T3', [0.006, -0.004, 0.0]],
+    },
+    'stp_pass': {
+        'description': 'Simplified test procedure, unbiased scanner',
+        'procedure': 'stp', 'parameters': {'alpha': 0.05, 'u_t': 1.0},
+        'seed': 5, 'noise': 0.0005, 'scale': 0.0,
+    },
+    'stp_fail': {
+        'description': 'Simplified test procedure, scale error of 200 ppm on S2',
+        'procedure': 'stp', 'parameters': {'alpha': 0.05, 'u_t': 0.5},
+        'seed': 6, 'noise': 0.0003, 'scale': 2e-4,
+    },
+}
+
+
+def rotation(rng, max_angle):
+    """
+    Random rotation about the vertical axis combined with a small tilt.
+
+    Args:
+    - rng (Generator): Random number generator.
+    - max_angle (float): Maximum rotation about the vertical axis (in rad).
+
+    Returns:
+    - ndarray: 3x3 rotation matrix.
+    """
+    a = rng.uniform(-max_angle, max_angle)
+    b, c = rng.normal(0, 1e-4, 2)
+    Rz = np.array([[np.cos(a), -np.sin(a), 0], [np.sin(a), np.cos(a), 0], [0, 0, 1]])
+    Rx = np.array([[1, 0, 0], [0, np.cos(b), -np.sin(b)], [0, np.sin(b), np.cos(b)]])
+    Ry = np.array([[np.cos(c), 0, np.sin(c)], [0, 1, 0], [-np.sin(c), 0, np.cos(c)]])
+    return Rz @ Rx @ Ry
+
+
+def write_leica(path, targets, coordinates, decimals=6):
+    """
+    Write target center coordinates in the leica format.
+
+    Args:
+    - path (str): Path of the file.
+    - targets (list): Names of the targets.
+    - coordinates (ndarray): Coordinates of shape (targets, 3).
+    - decimals (int): Number of decimals of the coordinates (default: 6).
+    """
+    with open(path, 'w') as f:
+        f.write('T,X,Y,Z\n')
+        for t, (x, y, z) in zip(targets, coordinates):
+            f.write(f'{t},{x:.{decimals}f},{y:.{decimals}f},{z:.{decimals}f}\n')
+
+
+def synthetic(directory, spec):
+    """
+    Simulate the scans of a campaign and write them in the leica format.
+
+    Every set is scanned in its own coordinate frame (random rotation and translation),
+    the distances are therefore only affected by the noise, the scale error and the outlier.
+
+    Args:
+    - directory (str): Output directory of the campaign.
+    - spec (dict): Specification of the case (see synthetic_cases).
+    """
+    rng = np.random.default_rng(spec['seed'])
+    n_sets = 3 if spec['procedure'] == 'ftp' else 1
+    os.makedirs(directory, exist_ok=True)
+    for station, offset in [('S1', np.array([-2.0, 1.0, 0.0])), ('S2', np.array([3.0, -2.0, 0.0]))]:
+        for w in range(1, n_sets + 1):
+            scale = 1 + spec['scale'] if station == 'S2' else 1
+            local = (field - offset)*scale + rng.normal(0, spec['noise'], field.shape)
+            if spec.get('outlier') and spec['outlier'][:2] == [station, w]:
+                t = int(spec['outlier'][2][1:]) - 1
+                local[t] += spec['outlier'][3]
+            local = local @ rotation(rng, np.pi).T + rng.uniform(-50, 50, 3)
+            write_leica(os.path.join(directory, f'{station}_set{w}.txt'), ['T1', 'T2', 'T3', 'T4'], local)
+
+
+def anonymize(source, directory, seed=0):
+    """
+    Anonymize real exports for the corpus.
+
+    The coordinates of every file are moved by a random rigid transformation and the file names
+    are replaced by their position in the sorted order. The distances, and therefore all results
+    of the evaluation, are unchanged apart from rounding (coordinates are written with 9 decimals).
+    The expected results have to be recorded from the anonymized files.
+
+    Args:
+    - source (str): Directory with the exported files of a campaign.
+    - directory (str): Output directory of the anonymized campaign.
+    - seed (int): Seed of the random transformations.
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(directory, exist_ok=True)
+    for nr, f in enumerate(sorted(os.listdir(source))):
+        df = pd.read_csv(os.path.join(source, f), header=0, usecols=['T', 'X', 'Y', 'Z'], names=['T', 'X', 'Y', 'Z'])
+        local = df[['X', 'Y', 'Z']].to_numpy(dtype=float)
+        local = (local - local.mean(axis=0)) @ rotation(rng, np.pi).T + rng.uniform(-50, 50, 3)
+        write_leica(os.path.join(directory, f'{nr:02d}.txt'), df['T'], local, decimals=9)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='regression/corpus.py', description='Generate the synthetic regression corpus or add anonymized real exports')
+    parser.add_argument('-anonymize', nargs=2, metavar=('SOURCE', 'NAME'), help='Anonymize the exports in SOURCE as new case NAME')
+    parser.add_argument('-procedure', choices=['ftp', 'stp'], default='ftp', help='Test procedure of the anonymized case (default: ftp)')
+    args = parser.parse_args()
+
+    if args.anonymize:
+        source, name = args.anonymize
+        directory = os.path.join(cases_directory, name)
+        if os.path.exists(directory):
+            print(f'Case {name} already exists!')
+            sys.exit()
+        anonymize(source, os.path.join(directory, 'data'))
+        with open(os.path.join(directory, 'case.yaml'), 'w') as f:
+            yaml.safe_dump({'description': f'Anonymized export ({name})', 'procedure': args.procedure,
+                            'parameters': {'alpha': 0.05, 'case': 'c'} if args.procedure == 'ftp' else {'alpha': 0.05, 'u_t': 1.0}}, f, sort_keys=False)
+        print(f'Added {directory}, adjust the parameters in case.yaml and record the expected results')
+    else:
+        for name, spec in synthetic_cases.items():
+            directory = os.path.join(cases_directory, name)
+            synthetic(os.path.join(directory, 'data'), spec)
+
+            # Recorded expected results and timing baselines are kept, the harness reports if they no longer match
+            case = {'description': spec['description'], 'procedure': spec['procedure'], 'parameters': spec['parameters']}
+            path = os.path.join(directory, 'case.yaml')
+            if os.path.exists(path):
+                with open(path, 'r') as f:
+                    recorded = yaml.safe_load(f)
+                case.update({key: recorded[key] for key in ['expected', 'timing'] if key in recorded})
+            with open(path, 'w') as f:
+                yaml.safe_dump(case, f, sort_keys=False)
+        print(f'Generated {len(synthetic_cases)} synthetic cases in {cases_directory}')
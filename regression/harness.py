@@ -0,0 +1,260 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+import types
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from computations import procedures
+from io_helpers import read
+
+cases_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cases')
+
+rtol = 1e-12  # relative tolerance of the numeric results
+atol = 1e-15  # absolute tolerance of the numeric results (in m)
+time_factor = 3.0  # allowed slowdown against the recorded runtime, both relative to the calibration
+
+compared_values = {
+    'ftp': ['std_0_1', 'std_0_2', 'v_1', 'v_2', 'v_mean', 'u_ISO_TLS', 'u_t', 'max_dev', 'results', 'passed'],
+    'stp': ['u_t', 'max_dev', 'results', 'passed'],
+}
+
+
+def find_cases(names=None):
+    """
+    Find the cases of the regression corpus.
+
+    Args:
+    - names (list): Names of the cases to be used (default: all cases).
+
+    Returns:
+    - list: Paths of the case directories.
+    """
+    found = sorted(d for d in os.listdir(cases_directory) if os.path.exists(os.path.join(cases_directory, d, 'case.yaml')))
+    if names:
+        found = [d for d in found if d in names]
+    return [os.path.join(cases_directory, d) for d in found]
+
+
+def load_case(path):
+    """
+    Load the definition, expected results and timing baseline of a case.
+
+    Args:
+    - path (str): Path of the case directory.
+
+    Returns:
+    - dict: Content of case.yaml.
+    """
+    with open(os.path.join(path, 'case.yaml'), 'r') as f:
+        return yaml.safe_load(f)
+
+
+def case_config(path, case):
+    """
+    Create the configuration of a case, equivalent to the one of the command line (fast-forward).
+
+    Args:
+    - path (str): Path of the case directory.
+    - case (dict): Content of case.yaml.
+
+    Returns:
+    - SimpleNamespace: Configuration object containing parameters for the test.
+    """
+    parameters = case['parameters']
+    config = types.SimpleNamespace(
+        data_directory=os.path.join(path, 'data'),
+        format=parameters.get('format', 'leica'),
+        ff=True,
+        ftp=case['procedure'] == 'ftp',
+        stp=case['procedure'] == 'stp',
+        alpha=parameters['alpha'],
+        case=parameters.get('case'),
+        screen=parameters.get('screen'),
+        screen_k=parameters.get('screen_k', 3.5),
+    )
+    for key in ['u_t', 'u_ms', 'u_p']:  # in mm as on the command line
+        if key in parameters:
+            setattr(config, key, parameters[key]/1e3)
+    return config
+
+
+def calibrate(repeat=5):
+    """
+    Measure the runtime of a fixed reference workload (parsing and distances with pandas and numpy).
+
+    The runtimes of the cases are compared relative to this runtime, which makes the timing
+    baselines independent of the speed and load of the machine.
+
+    Args:
+    - repeat (int): Number of runs, the fastest one is used.
+
+    Returns:
+    - float: Runtime of the reference workload (in s).
+    """
+    rng = np.random.default_rng(0)
+    text = 'T,X,Y,Z\n' + ''.join(f'T{i},{x:.6f},{y:.6f},{z:.6f}\n' for i, (x, y, z) in enumerate(rng.normal(0, 10, (4, 3)), start=1))
+
+    runtime = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(6):
+            df = pd.read_csv(io.StringIO(text)).set_index('T')
+            for i in range(4):
+                for j in range(i + 1, 4):
+                    np.linalg.norm(df.iloc[j] - df.iloc[i])
+        runtime = min(runtime, time.perf_counter() - start)
+    return runtime
+
+
+def evaluate(path, repeat=5):
+    """
+    Evaluate a case (reading and test procedure).
+
+    Args:
+    - path (str): Path of the case directory.
+    - repeat (int): Number of evaluations, the fastest one is used as runtime.
+
+    Returns:
+    - values (dict): Results of the evaluation, as stored in case.yaml.
+    - runtime (float): Runtime of the evaluation (in s).
+    """
+    case = load_case(path)
+    config = case_config(path, case)
+
+    runtime = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            data = read.read_path(config)
+            if config.ftp:
+                test = procedures.Full(data, config)
+            else:
+                test = procedures.Simplified(data, config)
+        runtime = min(runtime, time.perf_counter() - start)
+
+    values = dict()
+    for key in compared_values[case['procedure']]:
+        value = getattr(test, key)
+        if isinstance(value, dict):
+            values[key] = {k: float(v) for k, v in value.items()}
+        elif isinstance(value, (bool, np.bool_)):
+            values[key] = bool(value)
+        elif isinstance(value, (int, np.integer)):
+            values[key] = int(value)
+        else:
+            values[key] = float(value)
+    return values, runtime
+
+
+def compare(expected, values):
+    """
+    Compare the results of an evaluation with the expected results.
+
+    Args:
+    - expected (dict): Expected results.
+    - values (dict): Results of the evaluation.
+
+    Returns:
+    - list: Descriptions of the deviating values, empty if all values agree.
+    """
+    failures = []
+    for key, exp in expected.items():
+        if key not in values:
+            failures.append(f'{key}: missing')
+        elif isinstance(exp, dict):
+            failures += compare({f'{key}.{k}': v for k, v in exp.items()}, {f'{key}.{k}': v for k, v in values[key].items()})
+        elif isinstance(exp, (bool, int)):
+            if values[key] != exp:
+                failures.append(f'{key}: {values[key]} != {exp}')
+        elif not np.isclose(values[key], exp, rtol=rtol, atol=atol):
+            failures.append(f'{key}: {values[key]!r} != {exp!r}')
+    return failures
+
+
+def check_case(path, timing=True):
+    """
+    Evaluate a case and compare it with its expected results and timing baseline.
+
+    Args:
+    - path (str): Path of the case directory.
+    - timing (bool): Compare the runtime with the timing baseline as well (default: True).
+
+    Returns:
+    - name (str): Name of the case.
+    - failures (list): Descriptions of the deviations (results and runtime).
+    - runtime (float): Runtime of the evaluation relative to the calibration (NaN without timing).
+    - baseline (float): Recorded runtime relative to the calibration (NaN without timing).
+    """
+    case = load_case(path)
+    name = os.path.basename(path)
+    if 'expected' not in case:
+        return name, ['no expected results recorded'], np.nan, np.nan
+
+    values, runtime = evaluate(path)
+    failures = compare(case['expected'], values)
+
+    if not timing:
+        return name, failures, np.nan, np.nan
+    if 'timing' not in case:
+        return name, failures + ['no timing baseline recorded'], np.nan, np.nan
+
+    runtime = runtime/calibrate()
+    baseline = case['timing']['runtime']/case['timing']['calibration']
+    if runtime > time_factor*baseline:
+        failures.append(f'runtime: {runtime:.2f} > {time_factor}*{baseline:.2f} (relative to calibration)')
+    return name, failures, runtime, baseline
+
+
+def record(path):
+    """
+    Record the current results and runtime of a case as expected results and timing baseline.
+
+    Args:
+    - path (str): Path of the case directory.
+    """
+    case = load_case(path)
+    case['expected'], runtime = evaluate(path)
+    case['timing'] = {'runtime': round(runtime, 6), 'calibration': round(calibrate(), 6)}
+    with open(os.path.join(path, 'case.yaml'), 'w') as f:
+        yaml.safe_dump(case, f, sort_keys=False)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='regression/harness.py', description='Compare the evaluation of the regression corpus with the recorded results and runtimes')
+    parser.add_argument('cases', nargs='*', help='Names of the cases (default: all)')
+    parser.add_argument('-j', type=int, default=os.cpu_count(), help='Number of parallel processes (default: number of cores)')
+    parser.add_argument('-update', action='store_true', help='Record the current results and runtimes as expected')
+    parser.add_argument('-no_timing', action='store_true', help='Only compare the results, not the runtimes')
+    args = parser.parse_args()
+
+    paths = find_cases(args.cases)
+    if args.update:
+        for path in paths:  # sequential, for undisturbed timing baselines
+            record(path)
+            print(f'Recorded {os.path.basename(path)}')
+        sys.exit()
+
+    with ProcessPoolExecutor(max_workers=args.j) as executor:
+        checks = list(executor.map(check_case, paths, [not args.no_timing]*len(paths)))
+
+    for name, failures, runtime, baseline in checks:
+        status = '\033[92mok\033[0m' if not failures else '\033[91mFAILED\033[0m'
+        if np.isnan(runtime):
+            print(f'{name.ljust(30)} {status}')
+        else:
+            print(f'{name.ljust(30)} runtime {runtime:6.2f} (baseline {baseline:.2f}, relative to calibration) {status}')
+        for failure in failures:
+            print(f'  {failure}')
+
+    n_failed = sum(bool(failures) for _, failures, _, _ in checks)
+    print(f'{len(checks) - n_failed} passed, {n_failed} failed')
+    sys.exit(1 if n_failed else 0)
@@ -0,0 +1,239 @@
+import json
+import os
+import shutil
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import corpus
+import harness  # noqa: F401, adds the repository to the path
+from io_helpers import archive
+from io_helpers.columnar import pq
+from test_sensitivity import write_covariance
+
+parameters = {'procedure': 'ftp', 'alpha': 0.05, 'case': 'c'}
+
+
+@pytest.fixture
+def config(tmp_path):
+    """
+    Archive with an original campaign, a symlinked and a copied duplicate of it and a different campaign.
+    """
+    root = tmp_path / 'archive'
+    corpus.synthetic(root / 'original', corpus.synthetic_cases['ftp_case_a_pass'])
+    corpus.synthetic(root / 'other', corpus.synthetic_cases['ftp_case_c_fail'])
+    shutil.copytree(root / 'original', root / 'copy')
+    os.makedirs(root / 'symlink')
+    for f in os.listdir(root / 'original'):
+        os.symlink(root / 'original' / f, root / 'symlink' / f)
+
+    return types.SimpleNamespace(root=str(root), parameters=dict(parameters), journal=str(tmp_path / 'journal.jsonl'),
+                                 workers=1, max_pending=2, columnar=None, current_dt='2026-01-01 00:00')
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """
+    Runs the evaluations in threads and counts the hashed files and evaluated campaigns.
+    """
+    calls = {'hash': [], 'evaluate': []}
+    file_hash, evaluate = archive.file_hash, archive.evaluate
+
+    def counted_hash(path):
+        calls['hash'].append(path)
+        return file_hash(path)
+
+    def counted_evaluate(paths, *args):
+        calls['evaluate'].append(paths)
+        return evaluate(paths, *args)
+
+    monkeypatch.setattr(archive, 'ProcessPoolExecutor', ThreadPoolExecutor)
+    monkeypatch.setattr(archive, 'file_hash', counted_hash)
+    monkeypatch.setattr(archive, 'evaluate', counted_evaluate)
+    return calls
+
+
+def read_journal(path):
+    with open(path, 'r') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_duplicates(config, calls):
+    entries = archive.evaluate_archive(config)
+
+    assert sorted(entries) == ['copy', 'original', 'other', 'symlink']
+    assert entries['original']['inputs'] == entries['copy']['inputs'] == entries['symlink']['inputs']
+    assert entries['original']['passed'] and not entries['other']['passed']
+    assert len(calls['hash']) == 18  # the symlinked files are hashed through their targets
+    assert len(calls['evaluate']) == 2
+    assert len(read_journal(config.journal)) == 4
+
+
+def test_resume(config, calls):
+    inputs = archive.evaluate_archive(config)['other']['inputs']
+    calls['evaluate'].clear()
+
+    entries = archive.evaluate_archive(config)
+    assert len(entries) == 4
+    assert calls['evaluate'] == []
+
+    # Changed files and changed parameters are evaluated again
+    corpus.synthetic(os.path.join(config.root, 'other'), corpus.synthetic_cases['ftp_case_b_pass'])
+    entries = archive.evaluate_archive(config)
+    assert [os.path.basename(os.path.dirname(p[0])) for p in calls['evaluate']] == ['other']
+    assert entries['other']['inputs'] != inputs
+
+    calls['evaluate'].clear()
+    config.parameters['screen'] = 'flag'
+    config.parameters['screen_k'] = 3.5
+    archive.evaluate_archive(config)
+    assert len(calls['evaluate']) == 2
+
+
+def test_truncated_journal(config, calls):
+    archive.evaluate_archive(config)
+    with open(config.journal, 'rb+') as f:
+        f.truncate(os.path.getsize(config.journal) - 20)  # interrupted while writing the last entry
+    assert len(archive.load_journal(config.journal)) == 3
+
+    calls['evaluate'].clear()
+    entries = archive.evaluate_archive(config)
+    assert len(entries) == 4
+    assert len(calls['evaluate']) == 1
+
+    with open(config.journal, 'r') as f:
+        lines = f.read().splitlines()
+    assert len(lines) == 5
+    assert len(archive.load_journal(config.journal)) == 4
+
+
+def test_unreadable_file(config, calls, monkeypatch):
+    file_hash = archive.file_hash
+
+    def failing_hash(path):
+        if path.endswith(os.path.join('other', 'S1_set1.txt')):
+            raise PermissionError(13, 'Permission denied', path)
+        return file_hash(path)
+
+    monkeypatch.setattr(archive, 'file_hash', failing_hash)
+    entries = archive.evaluate_archive(config)
+    assert 'PermissionError' in entries['other']['error']
+    assert entries['original']['passed']
+
+    # Campaigns with unreadable files are evaluated again
+    monkeypatch.setattr(archive, 'file_hash', file_hash)
+    entries = archive.evaluate_archive(config)
+    assert 'error' not in entries['other']
+
+
+def test_sensitivity(config, calls):
+    for c in ['original', 'copy', 'symlink']:
+        write_covariance(os.path.join(config.root, c, 'cov.csv'), [1, 1, 1], inflated=('S2', 1, 'T1'))
+    config.parameters['cov'] = 'cov.csv'
+    entries = archive.evaluate_archive(config)
+
+    assert entries['original']['sensitivity'][0][1:4] == ['S2', 1, 'T1']
+    assert len(entries['original']['sensitivity']) == archive.n_sensitivity
+    assert sorted(entries['original']['u_results']) == sorted(entries['original']['results'])
+    assert 'cov.csv' in entries['other']['error']  # no covariance matrices
+
+
+def read_dataset(root):
+    files = [os.path.join(d, f) for d, _, fs in os.walk(root) for f in fs]
+    tables = [pq.read_table(f).to_pandas() if pq else dict(np.load(f)) for f in files]
+    return files, {c: np.concatenate([t[c] for t in tables]) for c in tables[0]} if tables else dict()
+
+
+def test_columnar(config, calls, tmp_path):
+    config.columnar = str(tmp_path / 'columnar')
+    archive.evaluate_archive(config)
+
+    # One file for all campaigns of the partition, the duplicates are exported separately
+    files, dataset = read_dataset(config.columnar)
+    assert len(files) == 1
+    assert len(dataset['campaign']) == 4*36
+    assert len(set(dataset['campaign'])) == 4
+    assert set(dataset['date']) == {''}  # no metadata.yaml
+    assert not any(dataset['excluded'])
+
+
+def test_columnar_interrupted(config, calls, tmp_path, monkeypatch):
+    config.columnar = str(tmp_path / 'columnar')
+    write = archive.columnar.ColumnarWriter.write
+
+    def failing_write(self, partition):
+        raise OSError(28, 'No space left on device')
+
+    # Campaigns are only journaled once their intermediates are on disk
+    monkeypatch.setattr(archive.columnar.ColumnarWriter, 'write', failing_write)
+    with pytest.raises(OSError):
+        archive.evaluate_archive(config)
+    assert archive.load_journal(config.journal) == dict()
+
+    monkeypatch.setattr(archive.columnar.ColumnarWriter, 'write', write)
+    archive.evaluate_archive(config)
+    files, dataset = read_dataset(config.columnar)
+    assert len(set(dataset['campaign'])) == 4
+    assert len(archive.load_journal(config.journal)) == 4
+
+
+def test_columnar_row_groups(tmp_path):
+    writer = archive.columnar.ColumnarWriter(str(tmp_path), row_group_size=100, max_buffered_rows=1000)
+    rows = {c: [0]*36 for c in archive.columnar.intermediate_columns}
+    written = []
+    for nr in range(30):
+        metadata = {'device': f'D{nr % 2}', 'serial_number': '1', 'datetime': f'2026-01-{nr + 1:02d} 10:00'}
+        written += writer.append(rows, metadata, f'c{nr}', '')
+    written += writer.close()
+
+    # A file for every 100 rows of a partition (every third campaign)
+    files, dataset = read_dataset(str(tmp_path))
+    assert sorted(written) == sorted(f'c{nr}' for nr in range(30))
+    assert len(files) == 2*5
+    assert len(dataset['campaign']) == 30*36
+    assert len(set(dataset['date'])) == 30
+
+
+def test_parse_error(config, calls):
+    path = os.path.join(config.root, 'other', 'S2_set3.txt')
+    with open(path, 'r') as f:
+        content = f.read()
+    with open(path, 'w') as f:
+        f.write('"unterminated\n')
+
+    entries = archive.evaluate_archive(config)
+    assert entries['other']['error'].startswith('S2_set3.txt: ParserError')
+
+    # Campaigns journaled with an error are evaluated again
+    calls['evaluate'].clear()
+    entries = archive.evaluate_archive(config)
+    assert len(calls['evaluate']) == 1 and 'error' in entries['other']
+
+    with open(path, 'w') as f:
+        f.write(content)
+    entries = archive.evaluate_archive(config)
+    assert 'error' not in entries['other']
+
+
+def test_diff():
+    previous = {'a': {'passed': True}, 'b': {'passed': True}, 'c': {'error': 'x'}, 'd': {'passed': False}}
+    entries = {'a': {'passed': True}, 'b': {'passed': False}, 'c': {'passed': True}, 'e': {'passed': True}}
+
+    changes, n_unchanged = archive.diff(entries, previous)
+    assert changes == [('b', 'passed', 'failed'), ('c', 'error', 'passed'), ('d', 'failed', ''), ('e', '', 'passed')]
+    assert n_unchanged == 1
+
+
+@pytest.mark.parametrize('content', ['', 'metadata: [\n', 'comment: no metadata\n'])
+def test_invalid_metadata(config, calls, content):
+    with open(os.path.join(config.root, 'other', 'metadata.yaml'), 'w') as f:
+        f.write(content)
+    with open(os.path.join(config.root, 'original', 'metadata.yaml'), 'w') as f:
+        f.write('metadata:\n  device: P50\n  serial_number: 123\n  datetime: 2026-01-01 10:00\n')
+
+    entries = archive.evaluate_archive(config)
+    assert 'metadata.yaml' in entries['other']['metadata_error']
+    assert entries['other']['device'] == '' and not entries['other']['passed']
+    assert entries['original']['serial_number'] == '123' and 'metadata_error' not in entries['original']
@@ -0,0 +1,18 @@
+import os
+
+import pytest
+
+import harness
+
+
+@pytest.mark.parametrize('path', harness.find_cases(), ids=os.path.basename)
+def test_results(path):
+    name, failures, runtime, baseline = harness.check_case(path, timing=False)
+    assert not failures, '\n'.join(failures)
+
+
+@pytest.mark.skipif(not os.environ.get('REGRESSION_TIMING'), reason='timing baselines are only checked with REGRESSION_TIMING=1')
+@pytest.mark.parametrize('path', harness.find_cases(), ids=os.path.basename)
+def test_timing(path):
+    name, failures, runtime, baseline = harness.check_case(path)
+    assert not failures, '\n'.join(failures)
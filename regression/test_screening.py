@@ -0,0 +1,63 @@
+import numpy as np
+
+import harness  # noqa: F401, adds the repository to the path
+from computations import screening
+from computations.procedures import combinations
+
+
+def test_loo_residuals():
+    d = np.array([[1.0, 2.0, 3.0], [5.0, 5.0, 5.0]])
+    assert np.allclose(screening.loo_residuals(d), [[-1.5, 0.0, 1.5], [0.0, 0.0, 0.0]])
+    assert screening.loo_residuals(np.zeros((4, 2, 6, 3))).shape == (4, 2, 6, 3)
+
+
+def test_scores():
+    rng = np.random.default_rng(0)
+    d = 10 + rng.normal(0, 0.001, (2, 6, 3))
+    d[0, 2, 1] += 0.01
+    z = screening.scores(d)
+    assert np.unravel_index(np.argmax(np.abs(z)), z.shape) == (0, 2, 1)
+    assert np.abs(z[0, 2, 1]) > 3.5
+
+    # Campaigns (leading axis) are scaled independently
+    batch = screening.scores(np.stack([d, 10 + 1000*(d - 10)]))
+    assert np.allclose(batch[0], z) and np.allclose(batch[1], z)
+
+
+def test_scores_zero_mad():
+    # Identical distances: no scale, all scores 0 instead of NaN
+    d = np.full((2, 6, 3), 10.0)
+    assert np.array_equal(screening.scores(d), np.zeros(d.shape))
+
+    # Most residuals 0: the MAD vanishes, a single deviation is not flagged
+    d[0, 2, 1] += 0.1
+    z = screening.scores(d)
+    assert np.all(np.isfinite(z)) and not screening.flag(z, 3.5).any()
+
+
+def test_flag():
+    z = np.array([[0.5, -5.0, 1.0], [0.5, 3.0, 1.0], [4.0, -4.0, 0.0], [6.0, 6.0, 6.0]])
+    assert screening.flag(z, 3.5).tolist() == [
+        [False, True, False],  # largest above k
+        [False, False, False],  # largest below k
+        [False, False, False],  # tie, the outlier can't be identified
+        [False, False, False],
+    ]
+
+
+def test_exclusion_of_suspect_targets():
+    rng = np.random.default_rng(1)
+    d = 10 + rng.normal(0, 0.0005, (2, 6, 3))
+    # Bad target center T3 in S1 set 2, displaced almost perpendicular to T2-T3
+    offsets = {('T1', 'T3'): 0.006, ('T2', 'T3'): 0.0008, ('T3', 'T4'): 0.005}
+    for p, pair in enumerate(combinations):
+        d[0, p, 1] += offsets.get(pair, 0)
+    single_distances = {(station, i, j): d[s, p] for s, station in enumerate(screening.stations) for p, (i, j) in enumerate(combinations)}
+
+    result = screening.Screening(single_distances, combinations)
+    assert result.suspect_targets == [('S1', 2, 'T3')]
+    assert not result.flagged[('S1', 'T2', 'T3')].any()
+    for (station, i, j), mask in result.excluded.items():
+        expected = [False, station == 'S1' and 'T3' in (i, j), False]
+        assert mask.tolist() == expected
+    assert result.n_flagged == 2 and result.n_excluded == 3
@@ -0,0 +1,100 @@
+import contextlib
+import io
+import os
+
+import numpy as np
+import pytest
+
+import harness
+from computations import procedures, sensitivity
+from io_helpers import read
+
+u = 0.001  # standard uncertainty of a coordinate (in m)
+
+
+def write_covariance(path, sigma, inflated=None):
+    """
+    Write covariance matrices in the csv format of -cov (in mm²).
+
+    Args:
+    - path (str): Path of the csv file.
+    - sigma (list): Standard deviations of X, Y and Z (in mm) of every point.
+    - inflated (tuple): (station, set, target) whose standard deviations are ten times larger.
+    """
+    with open(path, 'w') as f:
+        f.write('S,w,T,sxx,syy,szz,sxy,sxz,syz\n')
+        for station in sensitivity.stations:
+            for w in [1, 2, 3]:
+                for t in sensitivity.targets:
+                    s = np.array(sigma)*(10 if (station, w, t) == inflated else 1)
+                    f.write(f'{station},{w},{t},{s[0]**2},{s[1]**2},{s[2]**2},0,0,0\n')
+
+
+@pytest.fixture
+def campaign():
+    path = os.path.join(harness.cases_directory, 'ftp_case_c_fail')
+    config = harness.case_config(path, harness.load_case(path))
+    with contextlib.redirect_stdout(io.StringIO()):
+        data = read.read_path(config)
+    return data, procedures.Full(data, config)
+
+
+def deltas(P, weights):
+    d = np.linalg.norm(np.einsum('kt,...tc->...kc', sensitivity.incidence, P), axis=-1)  # (stations, sets, pairs)
+    mean = np.einsum('skw,swk->sk', weights, d)
+    return mean[0] - mean[1]
+
+
+def test_jacobian():
+    rng = np.random.default_rng(0)
+    P = rng.normal(0, 10, (2, 3, 4, 3))
+    weights = np.full((2, 6, 3), 1/3)
+    weights[0, 2] = [0.5, 0, 0.5]  # excluded single distance
+
+    J = sensitivity.jacobian(P, weights)
+    h = 1e-6
+    numeric = np.zeros_like(J)
+    for index in np.ndindex(P.shape):
+        dP = np.zeros_like(P)
+        dP[index] = h
+        numeric[(slice(None),) + index] = (deltas(P + dP, weights) - deltas(P - dP, weights))/(2*h)
+    assert np.allclose(J, numeric, atol=1e-8)
+
+
+def test_isotropic(campaign):
+    data, test = campaign
+    sens = sensitivity.Sensitivity(data, test, u=u)
+    assert sens.isotropic and sens.table == []
+    assert np.allclose(list(sens.u_results.values()), 2*u/np.sqrt(3))
+
+
+def test_anisotropic_ranking(campaign, tmp_path):
+    data, test = campaign
+    path = str(tmp_path / 'cov.csv')
+
+    # The same anisotropic matrix for every point: the ranking follows the geometry
+    write_covariance(path, [1, 1, 10])
+    sens = sensitivity.Sensitivity(data, test, cov=sensitivity.covariances(read.parse_covariance(path), data))
+    assert not sens.isotropic
+    assert len({round(row[4], 6) for row in sens.table}) > 1
+
+    # One inflated point dominates the deltas to its target
+    write_covariance(path, [1, 1, 1], inflated=('S1', 2, 'T3'))
+    sens = sensitivity.Sensitivity(data, test, cov=sensitivity.covariances(read.parse_covariance(path), data))
+    for key in ['delta_1_3', 'delta_2_3', 'delta_3_4']:
+        rows = [row for row in sens.table if row[0] == key]
+        assert rows[0][1:4] == ('S1', 2, 'T3')
+        assert rows[0][4] > 0.5
+
+
+def test_missing_covariance(campaign, tmp_path):
+    data, test = campaign
+    path = str(tmp_path / 'cov.csv')
+    write_covariance(path, [1, 1, 1])
+    with open(path, 'r') as f:
+        lines = f.readlines()
+    with open(path, 'w') as f:
+        f.writelines(lines[:-1])
+
+    with pytest.raises(KeyError):
+        sensitivity.covariances(read.parse_covariance(path), data)